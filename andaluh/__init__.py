@@ -9,8 +9,14 @@
 # - J. Félix Ontañón <felixonta@gmail.com>
 # - Sergio Soto <scots4ever@gmail.com>
 
-from .lib import epa
+from .lib import (epa, epa_many, epa_stream, epa_with_alignment,
+                  EPATranscriber, RuleProfiler)
 
 __all__ = [
     'epa',
+    'epa_many',
+    'epa_stream',
+    'epa_with_alignment',
+    'EPATranscriber',
+    'RuleProfiler',
 ]
@@ -0,0 +1,83 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# vim: ts=4
+###
+#
+# Copyright (c) 2018-2020 Andalugeeks
+# Authors:
+# - Ksar Feui <a.moreno.losana@gmail.com>
+# - J. Félix Ontañón <felixonta@gmail.com>
+# - Sergio Soto <scots4ever@gmail.com>
+
+import asyncio
+import os
+
+from functools import partial
+
+from andaluh.defs import VAF, VVF
+from andaluh.lib import epa_many, split_text
+
+# Chars transcribed per executor task. Longer texts are split in pieces of
+# about this size, shorter ones are batched together up to it.
+TASK_SIZE = 4096
+
+
+def _batches(pieces, size):
+    batch = []
+    length = 0
+    for piece in pieces:
+        if batch and length + len(piece) > size:
+            yield batch
+            batch = []
+            length = 0
+        batch.append(piece)
+        length += len(piece)
+    if batch:
+        yield batch
+
+
+async def epa_many_async(texts, vaf=VAF, vvf=VVF, escape_links=False,
+                         word_cache=False, engine='regex',
+                         lexicon_first=False, executor=None,
+                         max_concurrency=None, task_size=TASK_SIZE):
+    """Transcribe a batch of texts without blocking the event loop, returned
+    as a list in the same order.
+
+    The work is offloaded to executor, a thread or process pool, by default
+    the loop one. Long texts are split in pieces of about task_size chars
+    and short ones batched up to it, with at most max_concurrency tasks,
+    by default the number of CPUs, in flight at once."""
+
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(max_concurrency or os.cpu_count() or 1)
+    transcribe = partial(epa_many, vaf=vaf, vvf=vvf,
+                         escape_links=escape_links, word_cache=word_cache,
+                         engine=engine, lexicon_first=lexicon_first)
+
+    async def run(batch):
+        async with semaphore:
+            return await loop.run_in_executor(
+                executor, partial(transcribe, batch))
+
+    split = [split_text(text if isinstance(text, str) else str(text, 'utf-8'),
+                        task_size) for text in texts]
+    pieces = [piece for text_pieces in split for piece in text_pieces]
+    results = await asyncio.gather(
+        *(run(batch) for batch in _batches(pieces, task_size)))
+
+    transcribed = iter(piece for batch in results for piece in batch)
+    return [''.join(next(transcribed) for _ in text_pieces)
+            for text_pieces in split]
+
+
+async def epa_async(text, vaf=VAF, vvf=VVF, escape_links=False,
+                    word_cache=False, engine='regex', lexicon_first=False,
+                    executor=None, max_concurrency=None,
+                    task_size=TASK_SIZE):
+    """Transcribe text without blocking the event loop. See epa_many_async()
+    for the details"""
+
+    transcribed = await epa_many_async(
+        [text], vaf, vvf, escape_links, word_cache, engine, lexicon_first,
+        executor, max_concurrency, task_size)
+    return transcribed[0]
@@ -0,0 +1,166 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# vim: ts=4
+###
+#
+# Copyright (c) 2018-2020 Andalugeeks
+# Authors:
+# - Ksar Feui <a.moreno.losana@gmail.com>
+# - J. Félix Ontañón <felixonta@gmail.com>
+# - Sergio Soto <scots4ever@gmail.com>
+
+"""Persistent rule cache.
+
+Building a transcriber is mostly the re module parsing and compiling some
+forty rule regexes, trie generated alternations included, for every
+vaf/vvf configuration. A RuleCache keeps the result of that work, the
+trie sources and the compiled sre code of every pattern, in a file under
+the user cache dir, so short-lived processes load it instead:
+
+    from andaluh.cache import enable_rule_cache
+
+    enable_rule_cache()
+
+The cache file is keyed by the contents of andaluh/defs.py, andaluh/lib.py
+and this module, which any andaluh release changing the rules touches, and
+by the Python version, so a stale file is never used. Compiled sre code is
+only cached on CPython, elsewhere patterns are compiled as usual."""
+
+import os
+import pickle
+import re
+import sys
+import zlib
+
+import _sre
+
+try:
+    from re import _compiler, _parser
+except ImportError:
+    # Python < 3.11
+    import sre_compile as _compiler
+    import sre_parse as _parser
+
+from andaluh import defs, lib
+
+
+def cache_dir():
+    """$ANDALUH_CACHE_DIR, or andaluh under $XDG_CACHE_HOME or ~/.cache"""
+
+    path = os.environ.get('ANDALUH_CACHE_DIR')
+    if not path:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.join(
+            os.path.expanduser('~'), '.cache')
+        path = os.path.join(base, 'andaluh')
+    return path
+
+
+def cache_key():
+    """Checksum of everything the compiled rules depend on"""
+
+    parts = (sys.version, sys.implementation.name, _sre.MAGIC)
+    key = zlib.crc32(repr(parts).encode('utf-8'))
+    for path in (defs.__file__, lib.__file__, __file__):
+        with open(path, 'rb') as fh:
+            key = zlib.crc32(fh.read(), key)
+    return '%08x' % key
+
+
+def sre_compile_args(pattern, flags=0):
+    """re._compiler.compile() up to its final _sre.compile() call, whose
+    arguments are returned"""
+
+    tree = _parser.parse(pattern, flags)
+    # Opcodes are int subclasses which do not pickle
+    code = [int(op) for op in _compiler._code(tree, flags)]
+    state = tree.state
+    indexgroup = [None] * state.groups
+    for name, i in state.groupdict.items():
+        indexgroup[i] = name
+    return (pattern, int(flags | state.flags), code, state.groups - 1,
+            state.groupdict, tuple(indexgroup))
+
+
+def dump_pickle(obj, path):
+    """Pickle obj to path, creating its directory. The file is replaced
+    atomically, as other processes may be reading it"""
+
+    import tempfile
+
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as fh:
+            pickle.dump(obj, fh, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+class RuleCache(object):
+    """Compiled patterns and trie sources, loaded from and saved to path.
+
+    compile() and trie_regex() are drop-in replacements for re.compile()
+    and lib.trie_regex() which only do the work on a miss. save() writes
+    the cache back if anything was added."""
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(
+            cache_dir(), 'rules-%s.pickle' % cache_key())
+        self.patterns = {}
+        self.tries = {}
+        self.dirty = False
+        self.native = sys.implementation.name == 'cpython'
+        self.load()
+
+    def __reduce__(self):
+        # Loaded again from its file, i.e. in a worker process
+        return RuleCache, (self.path,)
+
+    def load(self):
+        try:
+            with open(self.path, 'rb') as fh:
+                data = pickle.load(fh)
+            self.patterns, self.tries = data['patterns'], data['tries']
+        except FileNotFoundError:
+            pass
+        except Exception:
+            # Corrupt or foreign file, it is rebuilt on save()
+            self.dirty = True
+
+    def save(self):
+        if not self.dirty:
+            return
+        dump_pickle({'patterns': self.patterns, 'tries': self.tries},
+                    self.path)
+        self.dirty = False
+
+    def compile(self, pattern, flags=0):
+        if not self.native:
+            return re.compile(pattern, flags)
+
+        key = (pattern, int(flags))
+        args = self.patterns.get(key)
+        if args is None:
+            args = self.patterns[key] = sre_compile_args(*key)
+            self.dirty = True
+        return _sre.compile(*args)
+
+    def trie_regex(self, words):
+        key = tuple(words)
+        source = self.tries.get(key)
+        if source is None:
+            source = self.tries[key] = lib.trie_regex(key)
+            self.dirty = True
+        return source
+
+
+def enable_rule_cache(path=None):
+    """Build the shared transcribers of epa() and co. from a RuleCache at
+    path, by default under cache_dir(), from now on"""
+
+    rule_cache = RuleCache(path)
+    lib.set_rule_cache(rule_cache)
+    return rule_cache
@@ -0,0 +1,126 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# vim: ts=4
+###
+#
+# Copyright (c) 2018-2020 Andalugeeks
+# Authors:
+# - Ksar Feui <a.moreno.losana@gmail.com>
+# - J. Félix Ontañón <felixonta@gmail.com>
+# - Sergio Soto <scots4ever@gmail.com>
+
+"""Transcription of whole text columns, i.e. of a DataFrame:
+
+    df['text_and'] = epa_column(df['text'])
+
+Instead of one epa() call per row, the distinct values of the column are
+transcribed once, optionally with a process pool, and scattered back to
+their rows, so the cost depends on the distinct values and not on the
+rows. pandas, pyarrow and numpy are not required by andaluh: a column of
+a library which is not imported cannot be given anyway."""
+
+import sys
+
+from andaluh.defs import VAF, VVF
+from andaluh.lib import AndaluhError, epa_many
+from andaluh.parallel import epa_parallel
+
+
+def _transcribe(values, vaf, vvf, escape_links, workers):
+    """Transcriptions of the str and bytes values. Others, like nulls, are
+    kept as they are."""
+
+    texts = [value for value in values if isinstance(value, (str, bytes))]
+    if workers:
+        transcribed = epa_parallel(texts, workers, vaf=vaf, vvf=vvf,
+                                   escape_links=escape_links)
+    else:
+        transcribed = iter(epa_many(texts, vaf=vaf, vvf=vvf,
+                                    escape_links=escape_links))
+
+    return [next(transcribed) if isinstance(value, (str, bytes)) else value
+            for value in values]
+
+
+def _pandas_column(series, transcribe):
+    pandas = sys.modules['pandas']
+    numpy = sys.modules['numpy']
+
+    if isinstance(series.dtype, pandas.CategoricalDtype):
+        series = series.astype(object)
+
+    # Codes of the nulls are -1, they pick the trailing None
+    codes, uniques = pandas.factorize(series)
+    values = numpy.empty(len(uniques) + 1, dtype=object)
+    values[:-1] = transcribe(list(uniques))
+    return series.where(codes < 0, values[codes])
+
+
+def _arrow_column(array, transcribe):
+    pyarrow = sys.modules['pyarrow']
+    import pyarrow.compute
+
+    if pyarrow.types.is_dictionary(array.type):
+        array = array.cast(array.type.value_type)
+    if not (pyarrow.types.is_string(array.type)
+            or pyarrow.types.is_large_string(array.type)):
+        raise AndaluhError('Not a string column', array.type)
+
+    # A null, if any, is one of the uniques and its own transcription
+    uniques = pyarrow.compute.unique(array)
+    values = pyarrow.array(transcribe(uniques.to_pylist()), type=array.type)
+
+    def scatter(chunk):
+        return values.take(pyarrow.compute.index_in(chunk, value_set=uniques))
+
+    if isinstance(array, pyarrow.ChunkedArray):
+        return pyarrow.chunked_array(
+            [scatter(chunk) for chunk in array.chunks], array.type)
+    return scatter(array)
+
+
+def _numpy_column(array, transcribe):
+    numpy = sys.modules['numpy']
+    flat = array.ravel()
+
+    if array.dtype.kind == 'U':
+        uniques, codes = numpy.unique(flat, return_inverse=True)
+        values = numpy.array(transcribe(uniques.tolist()), dtype=str)
+    elif array.dtype.kind == 'O':
+        index = {}
+        codes = numpy.fromiter(
+            (index.setdefault(value, len(index)) for value in flat),
+            dtype=numpy.intp, count=len(flat))
+        values = numpy.empty(len(index), dtype=object)
+        values[:] = transcribe(list(index))
+    else:
+        raise AndaluhError('Not a string column', array.dtype)
+
+    return values[codes].reshape(array.shape)
+
+
+def epa_column(column, vaf=VAF, vvf=VVF, escape_links=False, workers=None):
+    """Transcribe a pandas Series, a pyarrow Array or ChunkedArray, or a
+    numpy str or object array, returned as the same kind of column.
+
+    Every distinct value is transcribed once, with workers processes if
+    given (see andaluh.parallel), which use the lexicon and word tables
+    loaded in this process. Nulls, and any other non text values of
+    object columns, are kept as they are."""
+
+    def transcribe(values):
+        return _transcribe(values, vaf, vvf, escape_links, workers)
+
+    pandas = sys.modules.get('pandas')
+    pyarrow = sys.modules.get('pyarrow')
+    numpy = sys.modules.get('numpy')
+
+    if pandas is not None and isinstance(column, pandas.Series):
+        return _pandas_column(column, transcribe)
+    elif pyarrow is not None and isinstance(
+            column, (pyarrow.Array, pyarrow.ChunkedArray)):
+        return _arrow_column(column, transcribe)
+    elif numpy is not None and isinstance(column, numpy.ndarray):
+        return _numpy_column(column, transcribe)
+    else:
+        raise AndaluhError('Unsupported column type', type(column))
@@ -0,0 +1,137 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# vim: ts=4
+###
+#
+# Copyright (c) 2018-2020 Andalugeeks
+# Authors:
+# - Ksar Feui <a.moreno.losana@gmail.com>
+# - J. Félix Ontañón <felixonta@gmail.com>
+# - Sergio Soto <scots4ever@gmail.com>
+
+"""Incremental transcription of edited documents, i.e. from an editor:
+
+    doc = TranscribedDocument(text)
+    change = doc.edit(120, 125, 'nuevo')
+    output = output[:change.start] + change.text + output[change.end:]
+
+The source is kept in segments of about SEGMENT_SIZE chars cut at
+split_index() points, so each one transcribes on its own like within the
+whole text, next to its transcription. An edit only re-transcribes the
+segments it touches, so its cost depends on the edit size and not on the
+document one."""
+
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from itertools import accumulate
+
+from andaluh.defs import VAF, VVF
+from andaluh.lib import (AndaluhError, get_transcriber, split_index,
+                         split_text)
+
+# Source chars per segment, the minimum re-transcribed on an edit
+SEGMENT_SIZE = 256
+
+# output[start:end] of the transcription before an edit was replaced by text
+OutputEdit = namedtuple('OutputEdit', 'start end text')
+
+
+def _changed_range(old, new):
+    """Length of the common prefix and suffix of old and new"""
+
+    size = min(len(old), len(new))
+    prefix = 0
+    while prefix < size and old[prefix] == new[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < size - prefix and old[-1 - suffix] == new[-1 - suffix]:
+        suffix += 1
+    return prefix, suffix
+
+
+class TranscribedDocument(object):
+    """A source text and its EPA transcription, kept up to date on edits"""
+
+    def __init__(self, text='', vaf=VAF, vvf=VVF, escape_links=False,
+                 word_cache=False, segment_size=SEGMENT_SIZE):
+        self.vaf = vaf
+        self.vvf = vvf
+        self.escape_links = escape_links
+        self.word_cache = word_cache
+        self.segment_size = segment_size
+
+        self._sources = split_text(text, segment_size)
+        self._outputs = [self._transcribe(source)
+                         for source in self._sources]
+        # Segment offsets, with the total length at the end
+        self._starts = list(accumulate(map(len, self._sources), initial=0))
+        self._output_starts = list(
+            accumulate(map(len, self._outputs), initial=0))
+
+    def __len__(self):
+        return self._starts[-1]
+
+    @property
+    def source(self):
+        return ''.join(self._sources)
+
+    @property
+    def transcription(self):
+        return ''.join(self._outputs)
+
+    def _transcribe(self, text):
+        return get_transcriber(self.vaf, self.vvf).transcribe(
+            text, self.escape_links, word_cache=self.word_cache)
+
+    def edit(self, start, end, text):
+        """Replace source[start:end] with text. Returns the OutputEdit to
+        apply to the previous transcription, trimmed to the chars which
+        actually changed."""
+
+        starts = self._starts
+        if not 0 <= start <= end <= starts[-1]:
+            raise AndaluhError('Edit out of bounds', (start, end))
+
+        # The cut before the edit is untouched. The document end is no
+        # cut, so the last segment is always taken.
+        count = len(self._sources)
+        first = min(bisect_right(starts, start) - 1, count - 1)
+        last = min(bisect_left(starts, end, first + 1) - 1, count - 1)
+        if count == 0:
+            first, last = 0, -1
+
+        region_start = starts[first]
+        region = ''.join(self._sources[first:last + 1])
+        region = (region[:start - region_start] + text
+                  + region[end - region_start:])
+
+        # The cut after it may be no longer valid, i.e. an l typed before
+        # the mute h's ending a word, then take the next segment too
+        while (last < count - 1 and region
+               and split_index(region) != len(region)):
+            last += 1
+            region += self._sources[last]
+
+        sources = split_text(region, self.segment_size)
+        outputs = [self._transcribe(source) for source in sources]
+        output_start = self._output_starts[first]
+        old_output = ''.join(self._outputs[first:last + 1])
+        new_output = ''.join(outputs)
+
+        self._sources[first:last + 1] = sources
+        self._outputs[first:last + 1] = outputs
+        starts[first:] = accumulate(
+            map(len, self._sources[first:]), initial=region_start)
+        self._output_starts[first:] = accumulate(
+            map(len, self._outputs[first:]), initial=output_start)
+
+        prefix, suffix = _changed_range(old_output, new_output)
+        return OutputEdit(output_start + prefix,
+                          output_start + len(old_output) - suffix,
+                          new_output[prefix:len(new_output) - suffix])
+
+    def insert(self, pos, text):
+        return self.edit(pos, pos, text)
+
+    def delete(self, start, end):
+        return self.edit(start, end, '')
@@ -0,0 +1,250 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# vim: ts=4
+###
+#
+# Copyright (c) 2018-2020 Andalugeeks
+# Authors:
+# - Ksar Feui <a.moreno.losana@gmail.com>
+# - J. Félix Ontañón <felixonta@gmail.com>
+# - Sergio Soto <scots4ever@gmail.com>
+
+"""User exception lexicons.
+
+Extra rule exceptions, i.e. place or brand names, are written in a tab
+separated source file, one exception per line:
+
+    # category    word    replacement
+    h       hawaii      hawái
+    ending  cádî        cái
+
+and compiled once into a binary index with compile_lexicon() or
+`python -m andaluh.lexicon SOURCE INDEX`. Lexicon() memory-maps the index
+and looks words up with a binary search, so loading it costs the same for
+a hundred or a million entries.
+
+Categories are named after the EPATranscriber exception tables. Words are
+looked up as they stand when the rule of their category runs, i.e. words of
+the ending category are written in EPA like ENDING_RULES_EXCEPTION in
+defs.py.
+
+Whole words with their known EPA, i.e. the lemario, can also skip the rules
+altogether with epa(..., lexicon_first=True) once loaded with
+load_word_table()."""
+
+import argparse
+import csv
+import mmap
+import os
+import re
+import struct
+
+from collections.abc import Mapping
+from functools import lru_cache
+
+from andaluh.defs import VAF, VVF
+from andaluh.lib import (
+    AndaluhError, ExceptionTable, LEXICON_CATEGORIES as CATEGORIES, keep_case,
+    set_lexicon, set_word_table)
+
+# Index layout, little endian: magic, then a (count, offsets position)
+# header per category, then for each category count + 1 uint32 absolute
+# offsets delimiting its 'key\0replacement' utf-8 entries sorted by key.
+MAGIC = b'ANDLEX\x00\x01'
+HEADER = struct.Struct('<' + 'II' * len(CATEGORIES))
+OFFSET = struct.Struct('<I')
+
+LOOKUP_CACHE_SIZE = 16384
+
+word_re = re.compile(r'\w+')
+
+
+def read_source(path):
+    """Parse a lexicon source file into {category: {word: replacement}}"""
+
+    tables = {category: {} for category in CATEGORIES}
+    with open(path, encoding='utf-8') as fh:
+        for lineno, line in enumerate(fh, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+
+            fields = line.split('\t')
+            if len(fields) != 3:
+                raise AndaluhError('Malformed lexicon line', (path, lineno))
+            category, word, replacement = fields
+            if category not in tables:
+                raise AndaluhError('Unknown lexicon category', category)
+            if not word_re.fullmatch(word):
+                raise AndaluhError('Lexicon entries must be single words',
+                                   word)
+            tables[category][word.lower()] = replacement.lower()
+
+    return tables
+
+
+def compile_lexicon(source, target):
+    """Compile a lexicon source file into a binary index at target"""
+
+    tables = read_source(source)
+    header = []
+    body = bytearray()
+    position = len(MAGIC) + HEADER.size
+
+    for category in CATEGORIES:
+        entries = sorted(
+            (word.encode('utf-8'), replacement.encode('utf-8'))
+            for word, replacement in tables[category].items())
+        offsets_position = position + len(body)
+        data_position = offsets_position + OFFSET.size * (len(entries) + 1)
+
+        offsets = bytearray()
+        data = bytearray()
+        for word, replacement in entries:
+            offsets += OFFSET.pack(data_position + len(data))
+            data += word + b'\0' + replacement
+        offsets += OFFSET.pack(data_position + len(data))
+
+        header += [len(entries), offsets_position]
+        body += offsets + data
+
+    with open(target, 'wb') as fh:
+        fh.write(MAGIC)
+        fh.write(HEADER.pack(*header))
+        fh.write(body)
+
+
+class LexiconTable(Mapping):
+    """Exception table of one category, backed by the lexicon index.
+
+    Same lookups as lib.ExceptionTable, replace() keeps the case of the
+    word, but the entries stay on disk and are found by binary search.
+    Recent lookups are cached."""
+
+    def __init__(self, index, count, offsets):
+        self._index = index
+        self._count = count
+        self._offsets = offsets
+        self._lookup = lru_cache(LOOKUP_CACHE_SIZE)(self._search)
+
+    def _entry(self, i):
+        start, = OFFSET.unpack_from(self._index, self._offsets + 4 * i)
+        end, = OFFSET.unpack_from(self._index, self._offsets + 4 * (i + 1))
+        separator = self._index.find(b'\0', start, end)
+        return self._index[start:separator], self._index[separator + 1:end]
+
+    def _search(self, word):
+        key = word.encode('utf-8')
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            entry_key, replacement = self._entry(middle)
+            if entry_key < key:
+                low = middle + 1
+            elif entry_key > key:
+                high = middle
+            else:
+                return replacement.decode('utf-8')
+        return None
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        for i in range(self._count):
+            yield self._entry(i)[0].decode('utf-8')
+
+    def __getitem__(self, word):
+        replacement = self._lookup(word)
+        if replacement is None:
+            raise KeyError(word)
+        return replacement
+
+    def replace(self, word):
+        """Replacement for word keeping its case, or None if word is not an
+        exception"""
+
+        replacement = self._lookup(word.lower())
+        if replacement is not None:
+            replacement = keep_case(word, replacement)
+        return replacement
+
+
+class Lexicon(object):
+    """Memory-mapped compiled lexicon"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as fh:
+            if os.fstat(fh.fileno()).st_size < len(MAGIC) + HEADER.size:
+                raise AndaluhError('Not a compiled lexicon', path)
+            self._index = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._index[:len(MAGIC)] != MAGIC:
+            self._index.close()
+            raise AndaluhError('Not a compiled lexicon', path)
+
+        header = HEADER.unpack_from(self._index, len(MAGIC))
+        self.tables = {
+            category: LexiconTable(self._index, count, offsets)
+            for category, count, offsets
+            in zip(CATEGORIES, header[::2], header[1::2])}
+
+    def __len__(self):
+        return sum(len(table) for table in self.tables.values())
+
+    def __reduce__(self):
+        # Mapped again from its file, i.e. in a worker process
+        return Lexicon, (self.path,)
+
+    def table(self, category):
+        """LexiconTable for category, None if it has no entries"""
+
+        table = self.tables[category]
+        return table if len(table) else None
+
+
+def load_lexicon(path):
+    """Load a compiled lexicon and use it from now on in epa() and co."""
+
+    lexicon = Lexicon(path)
+    set_lexicon(lexicon)
+    return lexicon
+
+
+def read_word_table(path, source='cas', target='and'):
+    """ExceptionTable of the single words of a CSV with source and target
+    columns, like tests/lemario_cas_and.csv. Multiword rows are skipped, as
+    words are looked up one at a time."""
+
+    table = {}
+    with open(path, encoding='utf-8', newline='') as fh:
+        for row in csv.DictReader(fh):
+            word = row[source]
+            if word_re.fullmatch(word):
+                table[word] = row[target].lower()
+    return ExceptionTable(table)
+
+
+def load_word_table(path, source='cas', target='and', vaf=VAF, vvf=VVF):
+    """Load a word table with read_word_table() and use it from now on in
+    epa(..., lexicon_first=True) and co. Its EPA is written with the given
+    vaf/vvf, the lemario one with the default ones."""
+
+    word_table = read_word_table(path, source, target)
+    set_word_table(word_table, vaf, vvf)
+    return word_table
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Compile an andaluh exception lexicon')
+    parser.add_argument('source', help='Tab separated lexicon source file')
+    parser.add_argument('target', help='Compiled lexicon index file')
+    args = parser.parse_args()
+
+    compile_lexicon(args.source, args.target)
+
+
+if __name__ == '__main__':
+    main()
@@ -9,8 +9,15 @@
 # - J. Félix Ontañón <felixonta@gmail.com>
 # - Sergio Soto <scots4ever@gmail.com>
 
+import codecs
 import re
-import random
+import threading
+import time
+
+from array import array
+from collections import Counter, namedtuple
+from collections.abc import Mapping
+from functools import lru_cache
 
 from andaluh.defs import (VOWELS_ALL_NOTILDE,
                           H_RULES_EXCEPT,
@@ -26,12 +33,12 @@ from andaluh.defs import (VOWELS_ALL_NOTILDE,
                           WORDEND_D_RULES_EXCEPT,
                           WORDEND_D_INTERVOWEL_RULES_EXCEPT,
                           ENDING_RULES_EXCEPTION, )
-from functools import reduce
 
 
 # Regex compilation.
-# Words to ignore in the translitaration in escapeLinks mode.
-to_ignore_re = re.compile('|'.join([
+# Words to ignore in the translitaration in escapeLinks mode. Compiled on
+# first use by get_to_ignore_re(), as most callers never escape links.
+TO_IGNORE_PATTERN = '|'.join([
     # URLs, i.e. andaluh.es, www.andaluh.es, https://www.andaluh.es
     r'(?:https?://)?(?:www\.)?(?:[A-Za-z0-9-]+\.)+[A-Za-z]{2,}(?:[/?#][^\s]*)?',  # Cover full path/query/fragment  # NOQA 501
 
@@ -40,12 +47,208 @@ to_ignore_re = re.compile('|'.join([
 
     r'(?:@\w+\b)',  # Mentions, i.e. @andaluh
     r'(?:#\w+\b)',  # Hashtags, i.e. #andaluh
-    r'(?=\b[MCDXLVI]{1,8}\b)M{0,4}(?:CM|CD|D?C{0,3})(?:XC|XL|L?X{0,3})(?:IX|IV|V?I{0,3})'  # roman numerals  # NOQA 501
-]), re.UNICODE | re.IGNORECASE)
+    r'(?=\b[MCDXLVI]{1,8}\b)M{0,4}(?:CM|CD|D?C{0,3})(?:XC|XL|L?X{0,3})(?:IX|IV|V?I{0,3})\b'  # roman numerals  # NOQA 501
+])
+
+# Words and separators for the tokenized engine. Every rule but the word
+# interaction ones only looks inside a single word.
+token_re = re.compile(r'(\w+)', re.UNICODE)
+nonword_re = re.compile(r'\W', re.UNICODE)
+
+# Transcription engines. See EPATranscriber.transliterate()
+ENGINES = ('regex', 'tokenized')
+
+# Statistics of the lexicon-first word table, see EPATranscriber
+WordTableInfo = namedtuple('WordTableInfo', 'hits misses size')
+
+# Transcription with its token spans, see epa_with_alignment()
+AlignedTranscription = namedtuple('AlignedTranscription', 'text spans')
+
+# Exception tables a lexicon can extend, EPATranscriber.<category>_except
+LEXICON_CATEGORIES = (
+    'h',
+    'gj',
+    'v',
+    'll',
+    'wordend_d',
+    'wordend_s',
+    'wordend_const',
+    'wordend_d_intervowel',
+    'ending',
+)
+
+# Max distinct word forms kept per transcriber in word cache mode.
+WORD_CACHE_SIZE = 16384
+
+# Last place a text can be split without changing its transcription. See
+# split_index().
+split_re = re.compile(r'.*(?:^|[^lLhH])[hH]*\s', re.UNICODE | re.DOTALL)
+
+# Callables run after every rule as hook(rule_name, text_in, text_out,
+# elapsed, subs). See add_rule_hook() and RuleProfiler.
+rule_hooks = []
 
 # Auxiliary functions
 
 
+@lru_cache(maxsize=None)
+def get_to_ignore_re():
+    """Compiled TO_IGNORE_PATTERN"""
+
+    flags = re.UNICODE | re.IGNORECASE
+    if _rule_cache is None:
+        return re.compile(TO_IGNORE_PATTERN, flags)
+
+    pattern = _rule_cache.compile(TO_IGNORE_PATTERN, flags)
+    _rule_cache.save()
+    return pattern
+
+
+def link_parts(text):
+    """Split text around the words to ignore in escape links mode (links,
+    mentions, hashtags, ...), as (part, ignored) pairs"""
+
+    parts = []
+    pos = 0
+    for match in get_to_ignore_re().finditer(text):
+        start, end = match.span()
+        if start == end:
+            continue
+        if pos < start:
+            parts.append((text[pos:start], False))
+        parts.append((match.group(0), True))
+        pos = end
+    if pos < len(text):
+        parts.append((text[pos:], False))
+    return parts
+
+
+def split_index(text):
+    """Index of the last place where text can be split so both halves
+    transcribe like the whole text, or 0 if there is none.
+
+    That is right after a whitespace not preceded by an l, mute h's aside:
+    no rule looks across it, as only word interaction rules span words,
+    rotating a word ending l followed by a single whitespace."""
+
+    match = split_re.match(text)
+    return match.end() if match else 0
+
+
+def split_text(text, size):
+    """Split text in pieces of about size chars, cut at split_index(), so
+    transcribing them one by one gives the same result as the whole text.
+    Pieces only grow longer than size when there is no place to cut."""
+
+    pieces = []
+    pos = 0
+    while len(text) - pos > size:
+        window = size
+        i = split_index(text[pos:pos + window])
+        while not i and pos + window < len(text):
+            window *= 2
+            i = split_index(text[pos:pos + window])
+        if not i:
+            break
+        pieces.append(text[pos:pos + i])
+        pos += i
+    if pos < len(text):
+        pieces.append(text[pos:])
+    return pieces
+
+
+def split_stream(chunks):
+    """Yield the text of chunks, an iterable of str, in pieces cut at
+    split_index(), so transcribing them one by one gives the same result as
+    the whole text.
+
+    Each chunk is scanned once, from the last non-h char before it, as no
+    cut can appear in the text already held back. Only the text after the
+    last cut is held, but all of it: text without any, i.e. 'papel papel'
+    where every whitespace follows an l, comes out whole at the end."""
+
+    held = []
+    # End of the held text from its last non-h char, all of it if none
+    tail = ''
+
+    for chunk in chunks:
+        if not chunk:
+            continue
+        i = split_index(tail + chunk) - len(tail)
+        if i > 0:
+            held.append(chunk[:i])
+            yield ''.join(held)
+            held = []
+            tail = ''
+            chunk = chunk[i:]
+            if not chunk:
+                continue
+        held.append(chunk)
+        stripped = chunk.rstrip('hH')
+        tail = chunk[len(stripped) - 1:] if stripped else tail + chunk
+
+    if held:
+        yield ''.join(held)
+
+
+def trie_regex(words):
+    """Regex matching any of words, built as a trie of nested groups.
+
+    The regex engine tries the branches of a plain alternation one by one at
+    every position, so its cost grows with the number of words. A trie only
+    follows the branch of the next char, i.e. (?:b[cd]|c[cd]) instead of
+    (?:bc|bd|cc|cd)."""
+
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    if not trie:
+        # Never matches
+        return '(?!)'
+
+    return _trie_node_regex(trie) or ''
+
+
+def _trie_node_regex(node):
+    if list(node) == ['']:
+        return None
+
+    alternatives = []
+    chars = []
+    for char in sorted(node):
+        if not char:
+            continue
+        child = _trie_node_regex(node[char])
+        if child is None:
+            chars.append(re.escape(char))
+        else:
+            alternatives.append(re.escape(char) + child)
+
+    chars_only = not alternatives
+    if len(chars) == 1:
+        alternatives.append(chars[0])
+    elif chars:
+        alternatives.append('[' + ''.join(chars) + ']')
+
+    if len(alternatives) == 1:
+        regex = alternatives[0]
+    else:
+        regex = '(?:' + '|'.join(alternatives) + ')'
+
+    # A word ends here, the rest is optional
+    if '' in node:
+        if chars_only or len(alternatives) > 1:
+            regex += '?'
+        else:
+            regex = '(?:' + regex + ')?'
+
+    return regex
+
+
 def get_vowel_circumflex(vowel):
 
     # If no tilde, replace with circumflex
@@ -91,254 +294,540 @@ def keep_case(word, replacement_word):
     else:
         return replacement_word
 
-# EPA replacement functions
 
+class ExceptionTable(Mapping):
+    """Read-only exception table, mapping lowercase words to their EPA
+    replacement, with O(1) case aware lookups.
 
-def h_rules(text):
-    """Supress mute /h/"""
+    The replacement of the lowercase, title and uppercase forms of every
+    word is precomputed with keep_case(), so replace() is a single dict
+    lookup for them."""
 
-    def replace_with_case(match):
+    def __init__(self, table):
+        self._table = {word.lower(): repl for word, repl in table.items()}
+        self._cased = {}
+        for word, repl in self._table.items():
+            for form in (word, word.title(), word.upper()):
+                if form.lower() == word:
+                    self._cased[form] = keep_case(form, repl)
+
+    def __getitem__(self, word):
+        return self._table[word]
+
+    def __iter__(self):
+        return iter(self._table)
+
+    def __len__(self):
+        return len(self._table)
+
+    def replace(self, word):
+        """Replacement for word keeping its case, or None if word is not an
+        exception"""
+
+        replacement = self._cased.get(word)
+        if replacement is None:
+            replacement = self._table.get(word.lower())
+            if replacement is not None:
+                replacement = keep_case(word, replacement)
+        return replacement
+
+
+class ExceptionChain(object):
+    """Exception tables looked up in order, the first one wins"""
+
+    def __init__(self, *tables):
+        self.tables = tables
+
+    def replace(self, word):
+        for table in self.tables:
+            replacement = table.replace(word)
+            if replacement is not None:
+                return replacement
+        return None
+
+
+# Exception tables from defs.py, ready for lookups
+H_RULES_TABLE = ExceptionTable(H_RULES_EXCEPT)
+GJ_RULES_TABLE = ExceptionTable(GJ_RULES_EXCEPT)
+V_RULES_TABLE = ExceptionTable(V_RULES_EXCEPT)
+LL_RULES_TABLE = ExceptionTable(LL_RULES_EXCEPT)
+WORDEND_D_RULES_TABLE = ExceptionTable(WORDEND_D_RULES_EXCEPT)
+WORDEND_S_RULES_TABLE = ExceptionTable(WORDEND_S_RULES_EXCEPT)
+WORDEND_CONST_RULES_TABLE = ExceptionTable(WORDEND_CONST_RULES_EXCEPT)
+WORDEND_D_INTERVOWEL_RULES_TABLE = ExceptionTable(
+    WORDEND_D_INTERVOWEL_RULES_EXCEPT)
+ENDING_RULES_TABLE = ExceptionTable(ENDING_RULES_EXCEPTION)
+
+
+# Word ending vowel replacements. Unstressed endings get a circumflex,
+# stressed ones keep (or gain) the tilde.
+UNSTRESSED_RULES = {
+    'a': 'â', 'A': 'Â', 'á': 'â', 'Á': 'Â',
+    'e': 'ê', 'E': 'Ê', 'é': 'ê', 'É': 'Ê',
+    'i': 'î', 'I': 'Î', 'í': 'î', 'Í': 'Î',
+    'o': 'ô', 'O': 'Ô', 'ó': 'ô', 'Ó': 'Ô',
+    'u': 'û', 'U': 'Û', 'ú': 'û', 'Ú': 'Û'
+}
+
+STRESSED_RULES = {
+    'a': 'á', 'A': 'Á', 'á': 'á', 'Á': 'Á',
+    'e': 'é', 'E': 'É', 'é': 'é', 'É': 'É',
+    'i': 'î', 'I': 'Î', 'í': 'î', 'Í': 'Î',
+    'o': 'ô', 'O': 'Ô', 'ó': 'ô', 'Ó': 'Ô',
+    'u': 'û', 'U': 'Û', 'ú': 'û', 'Ú': 'Û'
+}
+
+TILDE_VOWELS = ('á', 'é', 'í', 'ó', 'ú', 'Á', 'É', 'Í', 'Ó', 'Ú')
+
+# EPA transcriber
+
+
+class EPATranscriber(object):
+    """EPA transcription engine for a given vaf/vvf configuration.
+
+    Every rule regex, including the big alternations built from DIGRAPHS and
+    ENDING_RULES_EXCEPTION, is compiled once when the transcriber is built, so
+    transcribing only pays for the matching itself. Build one per
+    configuration and reuse it, or let epa() do it for you.
+
+    Every rule but exception_rules has a trigger, i.e. 'x' for x_rules, and
+    is skipped on texts without it. skip_info() counts the skips per rule.
+
+    Transcribed words are memoized in a bounded LRU cache of
+    word_cache_size entries, used by transcribe(..., word_cache=True) with
+    the tokenized engine.
+
+    An instrumented transcriber also counts the substitutions made by each
+    rule for the rule hooks, at the cost of some speed.
+
+    The exceptions of a lexicon (see andaluh.lexicon) are looked up before
+    the built-in ones. word_table, an ExceptionTable of whole words and their
+    EPA, is used by transcribe(..., lexicon_first=True). A rule_cache (see
+    andaluh.cache) skips compiling the rule regexes."""
+
+    def __init__(self, vaf=VAF, vvf=VVF, word_cache_size=WORD_CACHE_SIZE,
+                 instrumented=False, lexicon=None, word_table=None,
+                 rule_cache=None):
+        self.vaf = vaf
+        self.vvf = vvf
+        self.instrumented = instrumented
+        self.lexicon = lexicon
+        self.word_table = word_table
+        self._word_table_hits = 0
+        self._word_table_misses = 0
+        self._word_table_lock = threading.Lock()
+
+        # Exception tables
+        self.h_except = H_RULES_TABLE
+        self.gj_except = GJ_RULES_TABLE
+        self.v_except = V_RULES_TABLE
+        self.ll_except = LL_RULES_TABLE
+        self.wordend_d_except = WORDEND_D_RULES_TABLE
+        self.wordend_s_except = WORDEND_S_RULES_TABLE
+        self.wordend_const_except = WORDEND_CONST_RULES_TABLE
+        self.wordend_d_intervowel_except = WORDEND_D_INTERVOWEL_RULES_TABLE
+        self.ending_except = ENDING_RULES_TABLE
+
+        if lexicon is not None:
+            for category in LEXICON_CATEGORIES:
+                table = lexicon.table(category)
+                if table is not None:
+                    name = category + '_except'
+                    setattr(self, name,
+                            ExceptionChain(table, getattr(self, name)))
+
+        # Rules that only look inside a single word
+        self.word_rules = [
+            self.h_rules,
+            self.x_rules,
+            self.ch_rules,
+            self.gj_rules,
+            self.v_rules,
+            self.ll_rules,
+            self.l_rules,
+            self.psico_pseudo_rules,
+            self.vaf_rules,
+            self.word_ending_rules,
+            self.digraph_rules,
+            self.exception_rules,
+        ]
+        # Rules that look across words
+        self.text_rules = [
+            self.word_interaction_rules
+        ]
+        self.rules = self.word_rules + self.text_rules
+
+        self.transliterate_word = lru_cache(maxsize=word_cache_size)(
+            self._transliterate_word)
+
+        iu = re.IGNORECASE | re.UNICODE
+
+        # A rule cache (see andaluh.cache) loads the compiled patterns and
+        # trie sources from disk instead of building them again.
+        if rule_cache is None:
+            compile_re, trie_source = re.compile, trie_regex
+        else:
+            compile_re, trie_source = rule_cache.compile, rule_cache.trie_regex
+
+        # h_rules
+        self._h_ua_re = compile_re(r'(?<!c)(h)(ua)', iu)
+        self._h_ue_re = compile_re(r'(?<!c)(h)(u)(e)', iu)
+        self._h_word_re = compile_re(r'\b(\w*?)(h)(\w*?)\b', iu)
+
+        # x_rules
+        self._x_intervowel_re = compile_re(
+            r'(a|e|i|o|u|á|é|í|ó|ú)(x)(a|e|i|o|u|y|á|é|í|ó|ú)', iu)
+        self._x_start_re = compile_re(r'\b(x)', iu)
+
+        # ch_rules
+        self._ch_re = compile_re(r'(c)(h)', re.IGNORECASE)
+
+        # gj_rules
+        self._gj_word_re = compile_re(r'\b(\w*?)(g|j)(e|i|é|í)(\w*?)\b', iu)
+        self._j_word_re = compile_re(r'\b(\w*?)(j)(a|o|u|á|ó|ú)(\w*?)\b', iu)
+        self._gj_char_re = compile_re(
+            r'(g|j)(?=e|i|é|í)|(j)(?=a|o|u|á|ó|ú)', iu)
+        self._gue_re = compile_re(r'(gu|gU)(e|i|é|í|E|I|É|Í)')
+        self._Gue_re = compile_re(r'(Gu|GU)(e|i|é|í|E|I|É|Í)')
+        self._gue_diaeresis_re = compile_re(r'(g|G)(ü)(e|i|é|í|E|I|É|Í)')
+        self._gUe_diaeresis_re = compile_re(r'(g|G)(Ü)(e|i|é|í|E|I|É|Í)')
+        self._buen_re = compile_re(r'(b)(uen)', iu)
+        self._bues_re = compile_re(
+            r'(?P<s>s?)(?P<a>a?)(?<!m)(?P<b>b)(?P<ue>ue)(?P<const>l|s)', iu)
+
+        # v_rules
+        self._v_word_re = compile_re(r'\b(\w*?)(v)(\w*?)\b', iu)
+
+        # ll_rules
+        self._ll_word_re = compile_re(r'\b(\w*?)(l)(l)(\w*?)\b', re.IGNORECASE)
+
+        # l_rules
+        self._l_re = compile_re(
+            r'(l)(b|c|ç|Ç|g|s|d|f|g|h|k|m|p|q|r|t|x|z)', re.IGNORECASE)
+
+        # psico_pseudo_rules
+        self._psico_pseudo_re = compile_re(r'(psic|psiq|pseud)', re.IGNORECASE)
+
+        # vaf_rules
+        self._vaf_zs_re = compile_re(
+            r'(z|s)(a|e|i|o|u|á|é|í|ó|ú|â|ê|î|ô|û)', iu)
+        self._vaf_c_re = compile_re(r'(c)(e|i|é|í|ê|î)', iu)
+
+        # digraph_rules
+        self._lstrst_re = compile_re(
+            r'(a|e|i|o|u|á|é|í|ó|ú)(l|r)(s)(t)', re.IGNORECASE)
+        self._transpost_re = compile_re(
+            r'(tr|p)(a|o)(ns|st)(b|c|ç|Ç|d|f|g|h|j|k|l|m|n|p|q|s|t|v|w|x|y|z)',
+            iu)
+        self._bdnr_s_re = compile_re(
+            r'(a|e|i|o|u|á|é|í|ó|ú)(b|d|n|r)(s)(b|c|ç|Ç|d|f|g|h|j|k|l|m|n|p|q|s|t|v|w|x|y|z)',  # NOQA: 501
+            iu)
+        self._digraph_l_re = compile_re(
+            r'(a|e|i|o|u|á|é|í|ó|ú)(d|j|r|s|t|x|z)(l)', iu)
+        self._digraph_re = compile_re(
+            r'(a|e|i|o|u|á|é|í|ó|ú)(' + trie_source(DIGRAPHS) + ')', iu)
+
+        # word_ending_rules
+        self._intervowel_d_end_re = compile_re(
+            r'\b(\w*?)(a|i|í|Í)(d)(o|a)(?P<s>s?)\b', iu)
+        self._eps_end_re = compile_re(r'\b(\w+?)(e)(ps)\b', iu)
+        self._d_end_re = compile_re(r'\b(\w+?)(a|e|i|o|u|á|é|í|ó|ú)(d)\b', iu)
+        self._s_end_re = compile_re(r'\b(\w+?)(a|e|i|o|u|á|é|í|ó|ú)(s)\b', iu)
+        self._const_end_re = compile_re(
+            r'\b(\w+?)(a|e|i|o|u|á|é|í|ó|ú)(b|c|f|g|j|k|l|p|r|t|x|z)\b', iu)
+
+        # exception_rules. A lexicon can hold far too many words for a
+        # regex, then every word is looked up instead.
+        if isinstance(self.ending_except, ExceptionTable):
+            self._exception_re = compile_re(
+                r'\b(' + trie_source(self.ending_except) + r')\b',
+                iu)
+        else:
+            self._exception_re = compile_re(r'\b(\w+)\b', iu)
+
+        # word_interaction_rules
+        self._word_interaction_re = compile_re(
+            r'\b(\w*?)(l)(\s)(b|c|ç|d|f|g|h|j|k|l|m|n|ñ|p|q|s|t|v|w|x|y|z)',
+            iu)
+        self._interaction_consonant_re = compile_re(
+            r'b|c|ç|d|f|g|h|j|k|l|m|n|ñ|p|q|s|t|v|w|x|y|z', iu)
+
+        # Fast path. A rule cannot change a text without a match of its
+        # trigger, a cheap search done before running all its regexes and
+        # callbacks. exception_rules has none, its trie regex is as cheap.
+        self._triggers = {
+            self.h_rules: compile_re(r'h', iu),
+            self.x_rules: compile_re(r'x', iu),
+            self.ch_rules: compile_re(r'ch', iu),
+            self.gj_rules: compile_re(r'g|j|bue', iu),
+            self.v_rules: compile_re(r'v', iu),
+            self.ll_rules: compile_re(r'll', iu),
+            self.l_rules: compile_re(r'l', iu),
+            self.psico_pseudo_rules: compile_re(r'ps', iu),
+            self.vaf_rules: compile_re(r'c|s|z', iu),
+            # A vowel and two consonants, as in every digraph rule
+            self.digraph_rules: compile_re(
+                r'(a|e|i|o|u|á|é|í|ó|ú)[^\Waeiouáéíóú]{2}', iu),
+            # A word ending consonant, or the -ado, -ido ... endings
+            self.word_ending_rules: compile_re(
+                r'(b|c|d|f|g|j|k|l|p|r|s|t|x|z|do|da)\b', iu),
+            self.word_interaction_rules: compile_re(r'l\s', iu),
+        }
+        self._skips = Counter()
+        self._skips_lock = threading.Lock()
+
+        # Substitutions made in the current thread, when instrumented
+        self._counter = threading.local()
+        if instrumented:
+            for name, value in list(vars(self).items()):
+                if isinstance(value, re.Pattern):
+                    setattr(self, name, CountingPattern(value, self._counter))
+
+    # EPA replacement rules
+
+    def h_rules(self, text):
+        """Supress mute /h/"""
+
+        # chihuahua => chiguagua
+        text = self._h_ua_re.sub(
+            lambda match: 'g' + match.group(2) if match.group(1).islower() else 'G' + match.group(2), text)  # NOQA: E501
+        # cacahuete => cacagûete
+        text = self._h_ue_re.sub(
+            lambda match: 'g' +
+            keep_case(
+                match.group(2),
+                'ü') +
+            match.group(3) if match.group(1).islower() else 'G' +
+            keep_case(
+                match.group(2),
+                'ü') +
+            match.group(3),
+            text)
+
+        # General /h/ replacements
+        text = self._h_word_re.sub(self._replace_h_word, text)
+        return text
+
+    def _replace_h_word(self, match):
         word = match.group(0)
 
-        if word.lower() in list(H_RULES_EXCEPT.keys()):
-            return keep_case(word, H_RULES_EXCEPT[word.lower()])
+        replacement = self.h_except.replace(word)
+        if replacement is not None:
+            return replacement
         else:
-            def replace_with_case(match):
-                h_char = match.group(1)
-                next_char = match.group(2)
-
-                if next_char and h_char.isupper():
-                    return next_char.upper()
-                elif next_char and h_char.islower():
-                    return next_char.lower()
-                else:
-                    return ''
-
-            return re.sub(
-                r'(?<!c)(h)(\w?)',
-                replace_with_case,
-                word,
-                flags=re.IGNORECASE)
-
-    # chihuahua => chiguagua
-    text = re.sub(r'(?<!c)(h)(ua)',
-                  lambda match: 'g' + match.group(2) if match.group(1).islower() else 'G' + match.group(2), text, flags=re.IGNORECASE | re.UNICODE)  # NOQA: E501
-    # cacahuete => cacagûete
-    text = re.sub(
-        r'(?<!c)(h)(u)(e)',
-        lambda match: 'g' +
-        keep_case(
-            match.group(2),
-            'ü') +
-        match.group(3) if match.group(1).islower() else 'G' +
-        keep_case(
-            match.group(2),
-            'ü') +
-        match.group(3),
-        text,
-        flags=re.IGNORECASE | re.UNICODE)
+            return self._drop_h(word)
+
+    @staticmethod
+    def _drop_h(word):
+        """Drop every h not following a c, giving its case to the next
+        char"""
+
+        # Lowercase words keep the case of the next char
+        if word.islower() and 'hh' not in word:
+            if 'ch' not in word:
+                return word.replace('h', '')
+            elif word.count('h') == word.count('ch'):
+                return word
+            return 'ch'.join(part.replace('h', '')
+                             for part in word.split('ch'))
 
-    # General /h/ replacements
-    text = re.sub(
-        r'\b(\w*?)(h)(\w*?)\b',
-        replace_with_case,
-        text,
-        flags=re.IGNORECASE | re.UNICODE)
-    return text
+        lower = word.replace('H', 'h').replace('C', 'c')
+        if lower.count('h') == lower.count('ch'):
+            return word
 
+        # Found case insensitively, left to right, without overlapping
+        chars = []
+        start = 0
+        i = lower.find('h')
+        while i >= 0:
+            if i and lower[i - 1] == 'c':
+                i = lower.find('h', i + 1)
+                continue
+            chars.append(word[start:i])
+            start = i + 2
+            if start <= len(word):
+                next_char = word[i + 1]
+                if word[i] == 'H':
+                    chars.append(next_char.upper())
+                else:
+                    chars.append(next_char.lower())
+            i = lower.find('h', start)
+        chars.append(word[start:])
+        return ''.join(chars)
 
-def x_rules(text, vaf=VAF):
-    """Replacement rules for /ks/ with EPA VAF"""
+    def x_rules(self, text):
+        """Replacement rules for /ks/ with EPA VAF"""
 
-    def replace_with_case(match):
-        x_char = match.group(1)
+        vaf = self.vaf
 
-        if x_char.islower():
-            return vaf
-        else:
-            return vaf.upper()
+        def replace_with_case(match):
+            x_char = match.group(1)
 
-    def replace_intervowel_with_case(match):
-        prev_char = match.group(1)
-        x_char = match.group(2)
-        next_char = match.group(3)
+            if x_char.islower():
+                return vaf
+            else:
+                return vaf.upper()
 
-        prev_char = get_vowel_circumflex(prev_char)
+        def replace_intervowel_with_case(match):
+            prev_char = match.group(1)
+            x_char = match.group(2)
+            next_char = match.group(3)
 
-        if x_char.isupper():
-            return prev_char + vaf.upper() * 2 + next_char
-        else:
-            return prev_char + vaf * 2 + next_char
+            prev_char = get_vowel_circumflex(prev_char)
 
-    # If the text begins with /ks/
-    # Xilófono roto => Çilófono roto
-    if text[0] == "X":
-        text = vaf.upper() + text[1:]
-    if text[0] == "x":
-        text = vaf + text[1:]
+            if x_char.isupper():
+                return prev_char + vaf.upper() * 2 + next_char
+            else:
+                return prev_char + vaf * 2 + next_char
 
-    # If the /ks/ sound is between vowels
-    # Axila => Aççila | Éxito => Éççito | Sexy => Çeççy
-    text = re.sub(
-        r'(a|e|i|o|u|á|é|í|ó|ú)(x)(a|e|i|o|u|y|á|é|í|ó|ú)',
-        replace_intervowel_with_case,
-        text,
-        flags=re.IGNORECASE | re.UNICODE)
+        # If the text begins with /ks/
+        # Xilófono roto => Çilófono roto
+        if text[0] == "X":
+            text = vaf.upper() + text[1:]
+        if text[0] == "x":
+            text = vaf + text[1:]
 
-    # Every word starting with /ks/
-    text = re.sub(r'\b(x)', replace_with_case, text,
-                  flags=re.IGNORECASE | re.UNICODE)
+        # If the /ks/ sound is between vowels
+        # Axila => Aççila | Éxito => Éççito | Sexy => Çeççy
+        text = self._x_intervowel_re.sub(replace_intervowel_with_case, text)
 
-    return text
+        # Every word starting with /ks/
+        text = self._x_start_re.sub(replace_with_case, text)
 
+        return text
 
-def ch_rules(text):
-    """Replacement rules for /∫/ (voiceless postalveolar fricative)"""
+    def ch_rules(self, text):
+        """Replacement rules for /∫/ (voiceless postalveolar fricative)"""
 
-    text = re.sub(r'(c)(h)', lambda match: 'x' if match.group(
-        1).islower() else 'X', text, flags=re.IGNORECASE)
-    return text
+        text = self._ch_re.sub(lambda match: 'x' if match.group(
+            1).islower() else 'X', text)
+        return text
 
+    def gj_rules(self, text):
+        """Replacing /x/ (voiceless postalveolar fricative) with /h/"""
 
-def gj_rules(text, vvf=VVF):
-    """Replacing /x/ (voiceless postalveolar fricative) with /h/"""
+        vvf = self.vvf
 
-    def replace_h_with_case(match):
-        word = match.group(0)
+        def replace_vvf_with_case(match):
+            return vvf if match.group(0).islower() else vvf.upper()
 
-        if word.lower() in list(GJ_RULES_EXCEPT.keys()):
-            return keep_case(word, GJ_RULES_EXCEPT[word.lower()])
-        else:
-            # TODO: This is an AWFUL way of implementing replacement rules with
-            # exceptions. To be fixed.
-            word = re.sub(
-                r'(g|j)(e|i|é|í)',
-                lambda match: vvf +
-                match.group(2) if match.group(1).islower() else vvf.upper() +
-                match.group(2),
-                word,
-                flags=re.IGNORECASE | re.UNICODE)
-            word = re.sub(
-                r'(j)(a|o|u|á|ó|ú)',
-                lambda match: vvf +
-                match.group(2) if match.group(1).islower() else vvf.upper() +
-                match.group(2),
-                word,
-                flags=re.IGNORECASE | re.UNICODE)
-            return word
+        def replace_h_with_case(match):
+            word = match.group(0)
 
-    def replace_g_with_case(match):
-        s = match.group('s')
-        a = match.group('a')
-        b = match.group('b')
-        ue = match.group('ue')
-        const = match.group('const')
-
-        return s + a + keep_case(b, 'g') + ue + const
-
-    text = re.sub(
-        r'\b(\w*?)(g|j)(e|i|é|í)(\w*?)\b',
-        replace_h_with_case,
-        text,
-        flags=re.IGNORECASE | re.UNICODE)
-    text = re.sub(
-        r'\b(\w*?)(j)(a|o|u|á|ó|ú)(\w*?)\b',
-        replace_h_with_case,
-        text,
-        flags=re.IGNORECASE | re.UNICODE)
-
-    # GUE,GUI replacement
-    text = re.sub(r'(gu|gU)(e|i|é|í|E|I|É|Í)', r'g\2', text)
-    text = re.sub(r'(Gu|GU)(e|i|é|í|E|I|É|Í)', r'G\2', text)
-
-    # GÜE,GÜI replacement
-    text = re.sub(r'(g|G)(ü)(e|i|é|í|E|I|É|Í)', r'\1u\3', text)
-    text = re.sub(r'(g|G)(Ü)(e|i|é|í|E|I|É|Í)', r'\1U\3', text)
-
-    # buen / abuel / sabues => guen / aguel / sagues
-    # TODO: I've the gut feeling the following two regex can be merged into
-    # one.
-    text = re.sub(r'(b)(uen)', lambda match: 'g' +
-                  match.group(2) if match.group(1).islower() else 'G' +
-                  match.group(2), text, flags=re.IGNORECASE | re.UNICODE)
-    text = re.sub(
-        r'(?P<s>s?)(?P<a>a?)(?<!m)(?P<b>b)(?P<ue>ue)(?P<const>l|s)',
-        replace_g_with_case,
-        text,
-        flags=re.IGNORECASE | re.UNICODE)
-
-    return text
+            replacement = self.gj_except.replace(word)
+            if replacement is not None:
+                return replacement
+            else:
+                # g/j before e/i and j before a/o/u, in one pass
+                return self._gj_char_re.sub(replace_vvf_with_case, word)
 
+        def replace_g_with_case(match):
+            s = match.group('s')
+            a = match.group('a')
+            b = match.group('b')
+            ue = match.group('ue')
+            const = match.group('const')
 
-def v_rules(text):
-    """Replacing all /v/ (Voiced labiodental fricative) with /b/"""
+            return s + a + keep_case(b, 'g') + ue + const
 
-    def replace_with_case(match):
-        word = match.group(0)
+        text = self._gj_word_re.sub(replace_h_with_case, text)
+        text = self._j_word_re.sub(replace_h_with_case, text)
 
-        if word.lower() in list(V_RULES_EXCEPT.keys()):
-            return keep_case(word, V_RULES_EXCEPT[word.lower()])
-        else:
-            # NV -> NB -> MB (i.e.: envidia -> embidia)
-            word = re.sub(
-                r'nv',
-                lambda match: keep_case(
-                    match.group(0),
-                    'mb'),
-                word,
-                flags=re.IGNORECASE | re.UNICODE)
-            word = re.sub(r'v', r'b', word)
-            word = re.sub(r'V', r'B', word)
-            return word
+        # GUE,GUI replacement
+        text = self._gue_re.sub(r'g\2', text)
+        text = self._Gue_re.sub(r'G\2', text)
 
-    text = re.sub(
-        r'\b(\w*?)(v)(\w*?)\b',
-        replace_with_case,
-        text,
-        flags=re.IGNORECASE | re.UNICODE)
-    return text
+        # GÜE,GÜI replacement
+        text = self._gue_diaeresis_re.sub(r'\1u\3', text)
+        text = self._gUe_diaeresis_re.sub(r'\1U\3', text)
 
+        # buen / abuel / sabues => guen / aguel / sagues
+        # TODO: I've the gut feeling the following two regex can be merged
+        # into one.
+        text = self._buen_re.sub(lambda match: 'g' +
+                                 match.group(2) if match.group(1).islower()
+                                 else 'G' + match.group(2), text)
+        text = self._bues_re.sub(replace_g_with_case, text)
 
-def ll_rules(text):
-    """Replace ll digraph.
+        return text
+
+    def v_rules(self, text):
+        """Replacing all /v/ (Voiced labiodental fricative) with /b/"""
 
-    Replacing /ʎ/ (digraph ll) with Greek Y for /ʤ/ sound (voiced
-    postalveolar affricate)"""
+        text = self._v_word_re.sub(self._replace_v_word, text)
+        return text
 
-    def replace_with_case(match):
+    def _replace_v_word(self, match):
         word = match.group(0)
 
-        if word.lower() in list(LL_RULES_EXCEPT.keys()):
-            return keep_case(word, LL_RULES_EXCEPT[word.lower()])
+        replacement = self.v_except.replace(word)
+        if replacement is not None:
+            return replacement
         else:
-            return re.sub(r'(l)(l)', lambda match: 'Y' if match.group(
-                1).isupper() else 'y', word, flags=re.IGNORECASE)
+            # NV -> NB -> MB (i.e.: envidia -> embidia), as keep_case()
+            word = word.replace('nv', 'mb').replace('nV', 'mb')
+            word = word.replace('Nv', 'Mb').replace('NV', 'MB')
+            word = word.replace('v', 'b')
+            word = word.replace('V', 'B')
+            return word
 
-    text = re.sub(
-        r'\b(\w*?)(l)(l)(\w*?)\b',
-        replace_with_case,
-        text,
-        flags=re.IGNORECASE)
-    return text
+    def ll_rules(self, text):
+        """Replace ll digraph.
 
+        Replacing /ʎ/ (digraph ll) with Greek Y for /ʤ/ sound (voiced
+        postalveolar affricate)"""
 
-def l_rules(text):
-    """Rotating /l/ with /r/"""
+        text = self._ll_word_re.sub(self._replace_ll_word, text)
+        return text
 
-    text = re.sub(
-        r'(l)(b|c|ç|Ç|g|s|d|f|g|h|k|m|p|q|r|t|x|z)',
-        lambda match: 'r' +
-        match.group(2) if match.group(1).islower() else 'R' +
-        match.group(2),
-        text,
-        flags=re.IGNORECASE)
-    return text
+    def _replace_ll_word(self, match):
+        word = match.group(0)
 
+        replacement = self.ll_except.replace(word)
+        if replacement is not None:
+            return replacement
+        else:
+            return self._replace_ll(word)
+
+    @staticmethod
+    def _replace_ll(word):
+        """Replace every ll with a y, upper if the first l is"""
+
+        if 'L' not in word:
+            return word.replace('ll', 'y')
+
+        # Found case insensitively, left to right, without overlapping
+        lower = word.replace('L', 'l')
+        chars = []
+        start = 0
+        i = lower.find('ll')
+        while i >= 0:
+            chars.append(word[start:i])
+            chars.append('Y' if word[i] == 'L' else 'y')
+            start = i + 2
+            i = lower.find('ll', start)
+        chars.append(word[start:])
+        return ''.join(chars)
+
+    def l_rules(self, text):
+        """Rotating /l/ with /r/"""
+
+        text = self._l_re.sub(
+            lambda match: 'r' +
+            match.group(2) if match.group(1).islower() else 'R' +
+            match.group(2),
+            text)
+        return text
 
-def psico_pseudo_rules(text):
-    """Drops /p/ for pseudo- or psico- prefixes"""
+    def psico_pseudo_rules(self, text):
+        """Drops /p/ for pseudo- or psico- prefixes"""
 
-    def replace_psicpseud_with_case(match):
+        text = self._psico_pseudo_re.sub(
+            self._replace_psicpseud_with_case, text)
+        return text
+
+    @staticmethod
+    def _replace_psicpseud_with_case(match):
         ps_syllable = match.group(1)
 
         if ps_syllable[0] == 'p':
@@ -346,41 +835,50 @@ def psico_pseudo_rules(text):
         else:
             return ps_syllable[1].upper() + ps_syllable[2:]
 
-    text = re.sub(
-        r'(psic|psiq|pseud)',
-        replace_psicpseud_with_case,
-        text,
-        flags=re.IGNORECASE)
-    return text
-
+    def vaf_rules(self, text):
+        """Replacing Voiceless alveolar fricative (vaf) /s/ /θ/ with EPA's
+        ç/Ç"""
 
-def vaf_rules(text, vaf=VAF):
-    """Replacing Voiceless alveolar fricative (vaf) /s/ /θ/ with EPA's ç/Ç"""
+        vaf = self.vaf
 
-    def replace_with_case(match):
-        l_char = match.group(1)
-        next_char = match.group(2)
+        def replace_with_case(match):
+            l_char = match.group(1)
+            next_char = match.group(2)
 
-        if l_char.islower():
-            return vaf + next_char
-        else:
-            return vaf.upper() + next_char
+            if l_char.islower():
+                return vaf + next_char
+            else:
+                return vaf.upper() + next_char
 
-    text = re.sub(
-        r'(z|s)(a|e|i|o|u|á|é|í|ó|ú|â|ê|î|ô|û)',
-        replace_with_case,
-        text,
-        flags=re.IGNORECASE | re.UNICODE)
-    text = re.sub(r'(c)(e|i|é|í|ê|î)', replace_with_case,
-                  text, flags=re.IGNORECASE | re.UNICODE)
+        text = self._vaf_zs_re.sub(replace_with_case, text)
+        text = self._vaf_c_re.sub(replace_with_case, text)
 
-    return text
+        return text
 
+    def digraph_rules(self, text):
+        """Replacement of consecutive consonant with EPA VAF"""
+
+        # intersticial / solsticio / superstición / cárstico => interttiçiâh /
+        # çorttiçio / çuperttiçión / cárttico
+        text = self._lstrst_re.sub(self._replace_lstrst_with_case, text)
+        # aerotransporte => aerotrâpporte | translado => trâl-lado |
+        # transcendente => trâççendente | postoperatorio => pôttoperatorio |
+        # postpalatal => pôppalatal
+        text = self._transpost_re.sub(self._replace_transpost_with_case, text)
+        # abstracto => âttrâtto | adscrito => âccrito | perspectiva =>
+        # pêrppêttiba
+        text = self._bdnr_s_re.sub(self._replace_bdnr_s_with_case, text)
+        # atlántico => âl-lántico | orla => ôl-la | adlátere => âl-látere |
+        # tesla => têl-la ...
+        text = self._digraph_l_re.sub(self._replace_l_with_case, text)
+
+        # General digraph rules.
+        text = self._digraph_re.sub(self._replace_digraph_with_case, text)
 
-def digraph_rules(text):
-    """Replacement of consecutive consonant with EPA VAF"""
+        return text
 
-    def replace_lstrst_with_case(match):
+    @staticmethod
+    def _replace_lstrst_with_case(match):
         vowel_char = match.group(1)
         lr_char = match.group(2)
         t_char = match.group(4)
@@ -394,7 +892,8 @@ def digraph_rules(text):
 
         return vowel_char + lr_char + t_char * 2
 
-    def replace_bdnr_s_with_case(match):
+    @staticmethod
+    def _replace_bdnr_s_with_case(match):
         vowel_char = match.group(1)
         cons_char = match.group(2)
         s_char = match.group(3)
@@ -405,7 +904,8 @@ def digraph_rules(text):
         else:
             return get_vowel_circumflex(vowel_char) + digraph_char * 2
 
-    def replace_transpost_with_case(match):
+    @staticmethod
+    def _replace_transpost_with_case(match):
         init_char = match.group(1)
         vowel_char = match.group(2)
         cons_char = match.group(4)
@@ -416,176 +916,97 @@ def digraph_rules(text):
         else:
             return init_char + get_vowel_circumflex(vowel_char) + cons_char * 2
 
-    def replace_l_with_case(match):
+    @staticmethod
+    def _replace_l_with_case(match):
         vowel_char = match.group(1)
         digraph_char = match.group(3)
 
         return get_vowel_circumflex(vowel_char) + \
             digraph_char + '-' + digraph_char
 
-    def replace_digraph_with_case(match):
+    @staticmethod
+    def _replace_digraph_with_case(match):
         vowel_char = match.group(1)
         to_drop_char, digraph_char = match.group(2)
 
         return get_vowel_circumflex(vowel_char) + digraph_char * 2
 
-    # intersticial / solsticio / superstición / cárstico => interttiçiâh /
-    # çorttiçio / çuperttiçión / cárttico
-    text = re.sub(
-        r'(a|e|i|o|u|á|é|í|ó|ú)(l|r)(s)(t)',
-        replace_lstrst_with_case,
-        text,
-        flags=re.IGNORECASE)
-    # aerotransporte => aerotrâpporte | translado => trâl-lado | transcendente
-    # => trâççendente | postoperatorio => pôttoperatorio | postpalatal =>
-    # pôppalatal
-    text = re.sub(
-        r'(tr|p)(a|o)(ns|st)(b|c|ç|Ç|d|f|g|h|j|k|l|m|n|p|q|s|t|v|w|x|y|z)',
-        replace_transpost_with_case,
-        text,
-        flags=re.IGNORECASE | re.UNICODE)
-    # abstracto => âttrâtto | adscrito => âccrito | perspectiva => pêrppêttiba
-    text = re.sub(
-        r'(a|e|i|o|u|á|é|í|ó|ú)(b|d|n|r)(s)(b|c|ç|Ç|d|f|g|h|j|k|l|m|n|p|q|s|t|v|w|x|y|z)',  # NOQA: 501
-        replace_bdnr_s_with_case,
-        text,
-        flags=re.IGNORECASE | re.UNICODE)
-    # atlántico => âl-lántico | orla => ôl-la | adlátere => âl-látere | tesla
-    # => têl-la ...
-    text = re.sub(
-        r'(a|e|i|o|u|á|é|í|ó|ú)(d|j|r|s|t|x|z)(l)',
-        replace_l_with_case,
-        text,
-        flags=re.IGNORECASE | re.UNICODE)
-
-    # General digraph rules.
-    text = re.sub(
-        r'(a|e|i|o|u|á|é|í|ó|ú)(' + '|'.join(DIGRAPHS) + ')',
-        replace_digraph_with_case,
-        text,
-        flags=re.IGNORECASE | re.UNICODE)
-
-    return text
-
-
-def word_ending_rules(text):  # noqa: C901
-
-    def replace_d_end_with_case(match):
-        unstressed_rules = {
-            'a': 'â', 'A': 'Â', 'á': 'â', 'Á': 'Â',
-            'e': 'ê', 'E': 'Ê', 'é': 'ê', 'É': 'Ê',
-            'i': 'î', 'I': 'Î', 'í': 'î', 'Í': 'Î',
-            'o': 'ô', 'O': 'Ô', 'ó': 'ô', 'Ó': 'Ô',
-            'u': 'û', 'U': 'Û', 'ú': 'û', 'Ú': 'Û'
-        }
+    def word_ending_rules(self, text):
 
-        stressed_rules = {
-            'a': 'á', 'A': 'Á', 'á': 'á', 'Á': 'Á',
-            'e': 'é', 'E': 'É', 'é': 'é', 'É': 'É',
-            'i': 'î', 'I': 'Î', 'í': 'î', 'Í': 'Î',
-            'o': 'ô', 'O': 'Ô', 'ó': 'ô', 'Ó': 'Ô',
-            'u': 'û', 'U': 'Û', 'ú': 'û', 'Ú': 'Û'
-        }
+        # Intervowel /d/ replacements
+        text = self._intervowel_d_end_re.sub(
+            self._replace_intervowel_d_end_with_case, text)
+
+        text = self._eps_end_re.sub(self._replace_eps_end_with_case, text)
+        text = self._d_end_re.sub(self._replace_d_end_with_case, text)
+        text = self._s_end_re.sub(self._replace_s_end_with_case, text)
+        text = self._const_end_re.sub(self._replace_const_end_with_case, text)
+
+        return text
 
+    def _replace_d_end_with_case(self, match):
         word = match.group(0)
         prefix = match.group(1)
         suffix_vowel = match.group(2)
         suffix_const = match.group(3)
 
-        if word.lower() in list(WORDEND_D_RULES_EXCEPT.keys()):
-            return keep_case(word, WORDEND_D_RULES_EXCEPT[word.lower()])
-        if any(
-            s in prefix for s in (
-                'á',
-                'é',
-                'í',
-                'ó',
-                'ú',
-                'Á',
-                'É',
-                'Í',
-                'Ó',
-                'Ú')):
-            return prefix + unstressed_rules[suffix_vowel]
+        replacement = self.wordend_d_except.replace(word)
+        if replacement is not None:
+            return replacement
+        if any(s in prefix for s in TILDE_VOWELS):
+            return prefix + UNSTRESSED_RULES[suffix_vowel]
         else:
             if suffix_vowel in ('a', 'e', 'A', 'E', 'á', 'é', 'Á', 'É'):
-                return prefix + stressed_rules[suffix_vowel]
+                return prefix + STRESSED_RULES[suffix_vowel]
             else:
                 if suffix_const.isupper():
-                    return prefix + stressed_rules[suffix_vowel] + 'H'
+                    return prefix + STRESSED_RULES[suffix_vowel] + 'H'
                 else:
-                    return prefix + stressed_rules[suffix_vowel] + 'h'
-
-    def replace_s_end_with_case(match):
-        repl_rules = {
-            'a': 'â', 'A': 'Â', 'á': 'â', 'Á': 'Â',
-            'e': 'ê', 'E': 'Ê', 'é': 'ê', 'É': 'Ê',
-            'i': 'î', 'I': 'Î', 'í': 'î', 'Í': 'Î',
-            'o': 'ô', 'O': 'Ô', 'ó': 'ô', 'Ó': 'Ô',
-            'u': 'û', 'U': 'Û', 'ú': 'û', 'Ú': 'Û'
-        }
+                    return prefix + STRESSED_RULES[suffix_vowel] + 'h'
 
+    def _replace_s_end_with_case(self, match):
         prefix = match.group(1)
         suffix_vowel = match.group(2)
         suffix_const = match.group(3)
         word = prefix + suffix_vowel + suffix_const
 
-        if word.lower() in list(WORDEND_S_RULES_EXCEPT.keys()):
-            return keep_case(word, WORDEND_S_RULES_EXCEPT[word.lower()])
-        elif suffix_vowel in ('á', 'é', 'í', 'ó', 'ú', 'Á', 'É', 'Í', 'Ó', 'Ú'):
+        replacement = self.wordend_s_except.replace(word)
+        if replacement is not None:
+            return replacement
+        elif suffix_vowel in TILDE_VOWELS:
             if suffix_const.isupper():
-                return prefix + repl_rules[suffix_vowel] + 'H'
+                return prefix + UNSTRESSED_RULES[suffix_vowel] + 'H'
             else:
-                return prefix + repl_rules[suffix_vowel] + 'h'
+                return prefix + UNSTRESSED_RULES[suffix_vowel] + 'h'
         else:
-            return prefix + repl_rules[suffix_vowel]
-
-    def replace_const_end_with_case(match):
-        repl_rules = {
-            'a': 'â', 'A': 'Â', 'á': 'â', 'Á': 'Â',
-            'e': 'ê', 'E': 'Ê', 'é': 'ê', 'É': 'Ê',
-            'i': 'î', 'I': 'Î', 'í': 'î', 'Í': 'Î',
-            'o': 'ô', 'O': 'Ô', 'ó': 'ô', 'Ó': 'Ô',
-            'u': 'û', 'U': 'Û', 'ú': 'û', 'Ú': 'Û'
-        }
+            return prefix + UNSTRESSED_RULES[suffix_vowel]
 
+    def _replace_const_end_with_case(self, match):
         word = match.group(0)
         prefix = match.group(1)
         suffix_vowel = match.group(2)
         suffix_const = match.group(3)
 
-        else_cond = any(
-            s in prefix
-            for s in ('á', 'é', 'í', 'ó', 'ú', 'Á', 'É', 'Í', 'Ó', 'Ú'))
+        else_cond = any(s in prefix for s in TILDE_VOWELS)
 
-        if word.lower() in list(WORDEND_CONST_RULES_EXCEPT.keys()):
-            return keep_case(word, WORDEND_CONST_RULES_EXCEPT[word.lower()])
+        replacement = self.wordend_const_except.replace(word)
+        if replacement is not None:
+            return replacement
         elif else_cond:
-            return prefix + repl_rules[suffix_vowel]
+            return prefix + UNSTRESSED_RULES[suffix_vowel]
         else:
             if suffix_const.isupper():
-                return prefix + repl_rules[suffix_vowel] + 'H'
+                return prefix + UNSTRESSED_RULES[suffix_vowel] + 'H'
             else:
-                return prefix + repl_rules[suffix_vowel] + 'h'
-
-    def replace_eps_end_with_case(match):
+                return prefix + UNSTRESSED_RULES[suffix_vowel] + 'h'
 
+    @staticmethod
+    def _replace_eps_end_with_case(match):
         prefix = match.group(1)
         suffix_vowel = match.group(2)
         suffix_const = match.group(3)
 
-        if any(
-            s in prefix for s in (
-                'á',
-                'é',
-                'í',
-                'ó',
-                'ú',
-                'Á',
-                'É',
-                'Í',
-                'Ó',
-                'Ú')):
+        if any(s in prefix for s in TILDE_VOWELS):
             if suffix_vowel.isupper():
                 return prefix + 'Ê'
             else:
@@ -595,7 +1016,7 @@ def word_ending_rules(text):  # noqa: C901
             # withough accent.
             return prefix + suffix_vowel + suffix_const
 
-    def replace_intervowel_d_end_with_case(match):
+    def _replace_intervowel_d_end_with_case(self, match):
         prefix = match.group(1)
         suffix_vowel_a = match.group(2)
         suffix_d_char = match.group(3)
@@ -604,12 +1025,10 @@ def word_ending_rules(text):  # noqa: C901
 
         suffix = suffix_vowel_a + suffix_d_char + suffix_vowel_b + ending_s
         word = prefix + suffix
-        else_cond = any(
-            s in prefix
-            for s in ('á', 'é', 'í', 'ó', 'ú', 'Á', 'É', 'Í', 'Ó', 'Ú'))
-        if word.lower() in list(WORDEND_D_INTERVOWEL_RULES_EXCEPT.keys()):
-            return keep_case(word,
-                             WORDEND_D_INTERVOWEL_RULES_EXCEPT[word.lower()])
+        else_cond = any(s in prefix for s in TILDE_VOWELS)
+        replacement = self.wordend_d_intervowel_except.replace(word)
+        if replacement is not None:
+            return replacement
         elif not else_cond:
             # Ending word -ada rules
             if suffix.lower() == 'ada':
@@ -619,8 +1038,8 @@ def word_ending_rules(text):  # noqa: C901
                     return prefix + 'á'
             # Ending word -ada rules
             if suffix.lower() == 'adas':
-                return prefix + \
-                    keep_case(suffix[:2], get_vowel_circumflex(suffix[0]) + 'h')
+                return prefix + keep_case(
+                    suffix[:2], get_vowel_circumflex(suffix[0]) + 'h')
             # Ending word -ado rules
             elif suffix.lower() == 'ado':
                 return prefix + suffix_vowel_a + suffix_vowel_b
@@ -641,62 +1060,29 @@ def word_ending_rules(text):  # noqa: C901
         else:
             return word
 
-    # Intervowel /d/ replacements
-    text = re.sub(
-        r'\b(\w*?)(a|i|í|Í)(d)(o|a)(?P<s>s?)\b',
-        replace_intervowel_d_end_with_case,
-        text,
-        flags=re.IGNORECASE | re.UNICODE)
-
-    text = re.sub(
-        r'\b(\w+?)(e)(ps)\b',
-        replace_eps_end_with_case,
-        text,
-        flags=re.IGNORECASE | re.UNICODE)
-    text = re.sub(
-        r'\b(\w+?)(a|e|i|o|u|á|é|í|ó|ú)(d)\b',
-        replace_d_end_with_case,
-        text,
-        flags=re.IGNORECASE | re.UNICODE)
-    text = re.sub(
-        r'\b(\w+?)(a|e|i|o|u|á|é|í|ó|ú)(s)\b',
-        replace_s_end_with_case,
-        text,
-        flags=re.IGNORECASE | re.UNICODE)
-    text = re.sub(
-        r'\b(\w+?)(a|e|i|o|u|á|é|í|ó|ú)(b|c|f|g|j|k|l|p|r|t|x|z)\b',
-        replace_const_end_with_case,
-        text,
-        flags=re.IGNORECASE | re.UNICODE)
-
-    return text
-
+    def exception_rules(self, text):
+        """Set of exceptions to the replacement algorithm"""
 
-def exception_rules(text):
-    """Set of exceptions to the replacement algorithm"""
+        text = self._exception_re.sub(self._replace_exception_with_case, text)
+        return text
 
-    def replace_with_case(match):
+    def _replace_exception_with_case(self, match):
         word = match.group(1)
 
-        replacement_word = ENDING_RULES_EXCEPTION[word.lower()]
-        return keep_case(word, replacement_word)
+        replacement = self.ending_except.replace(word)
+        return word if replacement is None else replacement
 
-    text = re.sub(
-        r'\b(' +
-        '|'.join(
-            list(
-                ENDING_RULES_EXCEPTION.keys())) +
-        r')\b',
-        replace_with_case,
-        text,
-        flags=re.IGNORECASE | re.UNICODE)
-    return text
+    def word_interaction_rules(self, text):
+        """Contractions and other word interaction rules"""
 
+        # Rotating word ending /l/ with /r/ if first next word char is non-r
+        # consonant
+        text = self._word_interaction_re.sub(
+            self._replace_word_interaction_with_case, text)
+        return text
 
-def word_interaction_rules(text):
-    """Contractions and other word interaction rules"""
-
-    def replace_with_case(match):
+    @staticmethod
+    def _replace_word_interaction_with_case(match):
         prefix = match.group(1)
         l_char = match.group(2)
         whitespace_char = match.group(3)
@@ -705,83 +1091,565 @@ def word_interaction_rules(text):
         r_char = keep_case(l_char, 'r')
         return prefix + r_char + whitespace_char + next_word_char
 
-    # Rotating word ending /l/ with /r/ if first next word char is non-r
-    # consonant
-    text = re.sub(
-        r'\b(\w*?)(l)(\s)(b|c|ç|d|f|g|h|j|k|l|m|n|ñ|p|q|s|t|v|w|x|y|z)',
-        replace_with_case,
-        text,
-        flags=re.IGNORECASE | re.UNICODE)
-    return text
+    # Transcription
 
-# Main function
+    def transliterate(self, text, debug=False, word_cache=False,
+                      engine='regex', lexicon_first=False):
+        """Run the whole rule pipeline over text.
 
+        The regex engine runs every rule over the whole text. The tokenized
+        engine splits words and separators once, runs the word rules on
+        every word and the word interaction rules on the token stream. Both
+        give the same output. word_cache memoizes the transcribed words in
+        the LRU word cache, and implies the tokenized engine.
 
-def epa(text, vaf=VAF, vvf=VVF, escape_links=False, debug=False):  # noqa: C901
-    rules = [
-        h_rules,
-        x_rules,
-        ch_rules,
-        gj_rules,
-        v_rules,
-        ll_rules,
-        l_rules,
-        psico_pseudo_rules,
-        vaf_rules,
-        word_ending_rules,
-        digraph_rules,
-        exception_rules,
-        word_interaction_rules
-    ]
-
-    if not isinstance(text, str):
-        text = str(text, 'utf-8')
-
-    # Do not start transcription if the input is empty
-    if not text:
-        return text
+        lexicon_first looks every word up in the word table and only runs
+        the word rules on the unknown ones. It implies the tokenized
+        engine."""
+
+        hooks = rule_hooks + [print_rule] if debug else rule_hooks
+
+        if engine not in ENGINES:
+            raise AndaluhError('Unknown engine', engine)
+        elif lexicon_first and self.word_table is None:
+            raise AndaluhError('No word table loaded', None)
+        elif engine == 'tokenized' or word_cache or lexicon_first:
+            return self.transliterate_tokens(
+                text, hooks, word_cache, debug, lexicon_first)
+        else:
+            return self.apply_rules(self.rules, text, hooks)
+
+    def transliterate_tokens(self, text, hooks=(), word_cache=False,
+                             debug=False, lexicon_first=False):
+        """Tokenized engine. See transliterate()"""
+
+        # Separators at even indexes, words at odd ones
+        tokens = token_re.split(text)
+        self.transliterate_words(tokens, word_cache, lexicon_first)
+
+        if debug:
+            print('word_rules => ' + ''.join(tokens))
+
+        if not hooks:
+            self.word_interaction_tokens(tokens)
+            return ''.join(tokens)
+
+        text = ''.join(tokens)
+        start = time.perf_counter()
+        subs = self.word_interaction_tokens(tokens)
+        elapsed = time.perf_counter() - start
+        text_out = ''.join(tokens)
+        for hook in hooks:
+            hook('word_interaction_rules', text, text_out, elapsed, subs)
+
+        return text_out
+
+    def transliterate_words(self, tokens, word_cache=False,
+                            lexicon_first=False):
+        """Word rules over the words of a token_re split token list, in
+        place"""
+
+        pending = range(1, len(tokens), 2)
+
+        if lexicon_first:
+            replace = self.word_table.replace
+            misses = []
+            for i in pending:
+                word_and = replace(tokens[i])
+                if word_and is None:
+                    misses.append(i)
+                else:
+                    tokens[i] = word_and
+            with self._word_table_lock:
+                self._word_table_hits += len(pending) - len(misses)
+                self._word_table_misses += len(misses)
+            pending = misses
+
+        if word_cache:
+            transliterate_word = self.transliterate_word
+            for i in pending:
+                tokens[i] = transliterate_word(tokens[i])
+        else:
+            # Repeated words are still transliterated once per text
+            words = {}
+            for i in pending:
+                word = tokens[i]
+                word_and = words.get(word)
+                if word_and is None:
+                    word_and = words[word] = self._transliterate_word(word)
+                tokens[i] = word_and
+
+    def _transliterate_word(self, word):
+        return self.apply_rules(self.word_rules, word, rule_hooks)
+
+    def word_interaction_tokens(self, tokens):
+        """word_interaction_rules over a transliterated token list, in
+        place. Returns the number of substitutions."""
+
+        consonant_re = self._interaction_consonant_re
+        subs = 0
+        # Whether the first char of the current word was taken by the
+        # previous substitution, as the regex engine would.
+        taken = False
+
+        for i in range(1, len(tokens) - 2, 2):
+            word = tokens[i]
+            whitespace = tokens[i + 1]
+            next_word = tokens[i + 2]
+
+            if (word[-1:] in ('l', 'L')
+                    and not (taken and not nonword_re.search(word))
+                    and len(whitespace) == 1 and whitespace.isspace()
+                    and consonant_re.match(next_word)):
+                tokens[i] = word[:-1] + keep_case(word[-1], 'r')
+                subs += 1
+                taken = True
+            else:
+                taken = False
+
+        return subs
+
+    def apply_rules(self, rules, text, hooks=()):
+        """Run rules over text, calling every hook after each rule. Rules
+        whose trigger is not in the text are skipped."""
+
+        triggers = self._triggers
+        skipped = []
+
+        if not hooks:
+            for rule in rules:
+                trigger = triggers.get(rule)
+                if trigger is not None and not trigger.search(text):
+                    skipped.append(rule.__name__)
+                else:
+                    text = rule(text)
+            self._count_skips(skipped)
+            return text
+
+        counter = self._counter
+        clock = time.perf_counter
 
-    def transliterate(text):
         for rule in rules:
-            if rule in [x_rules, vaf_rules]:
-                text = rule(text, vaf)
-            elif rule == gj_rules:
-                text = rule(text, vvf)
+            subs = getattr(counter, 'subs', 0)
+            start = clock()
+            trigger = triggers.get(rule)
+            if trigger is not None and not trigger.search(text):
+                skipped.append(rule.__name__)
+                text_out = text
+            else:
+                text_out = rule(text)
+            elapsed = clock() - start
+            if self.instrumented:
+                # No substitution at all yet in this thread if every rule
+                # so far was skipped
+                subs = getattr(counter, 'subs', 0) - subs
             else:
-                text = rule(text)
-            if debug:
-                print(rule.__name__ + ' => ' + text)
+                subs = None
 
-        return text
+            for hook in hooks:
+                hook(rule.__name__, text, text_out, elapsed, subs)
+            text = text_out
 
-    if escape_links:
-        # Words in the message not to transliterate
-        ignore = to_ignore_re.findall(text)
-        # Spanish words in the message to transliterate
-        words = to_ignore_re.split(text)
+        self._count_skips(skipped)
+        return text
 
-        if not ignore:
-            tags = []
-            text = text
-        else:
-            # Replace words to ignore in the transliteration with randints
-            tags = list(zip([str(random.randint(1, 999999999))
-                             for x in ignore], ignore))
-            text = ''.join(reduce(
-                lambda x, y: ''.join(x) + ''.join(y), list(zip(words, [x[0] for x in tags]))))  # NOQA: 501
-            if len(words) > len(ignore):
-                text += words[-1]
+    def _count_skips(self, skipped):
+        if skipped:
+            with self._skips_lock:
+                self._skips.update(skipped)
+
+    def cache_info(self):
+        """Hit/miss statistics of the word cache, as functools.lru_cache"""
+        return self.transliterate_word.cache_info()
+
+    def cache_clear(self):
+        """Empty the word cache and reset its statistics"""
+        self.transliterate_word.cache_clear()
+
+    def word_table_info(self):
+        """Hit/miss statistics of the lexicon-first word table, counted per
+        word"""
+        size = len(self.word_table) if self.word_table is not None else 0
+        return WordTableInfo(
+            self._word_table_hits, self._word_table_misses, size)
+
+    def word_table_clear(self):
+        """Reset the word table statistics"""
+        with self._word_table_lock:
+            self._word_table_hits = self._word_table_misses = 0
+
+    def skip_info(self):
+        """Times each rule with a trigger was skipped, by rule name"""
+        with self._skips_lock:
+            return {rule.__name__: self._skips[rule.__name__]
+                    for rule in self.rules if rule in self._triggers}
+
+    def skip_clear(self):
+        """Reset the rule skip counters"""
+        with self._skips_lock:
+            self._skips.clear()
+
+    def transcribe(self, text, escape_links=False, debug=False,
+                   word_cache=False, engine='regex', lexicon_first=False):
+        """Transcribe text to EPA. See epa() for the details"""
+
+        if not isinstance(text, str):
+            text = str(text, 'utf-8')
+
+        # Do not start transcription if the input is empty
+        if not text:
+            return text
+
+        if not escape_links:
+            return self.transliterate(
+                text, debug, word_cache, engine, lexicon_first)
+
+        # Only transliterate the text between the words to ignore (links,
+        # mentions, hashtags, ...), which are spliced back as they are.
+        parts = []
+        for part, ignored in link_parts(text):
+            if not ignored:
+                part = self.transliterate(
+                    part, debug, word_cache, engine, lexicon_first)
+            elif debug:
+                print('escapeLinks => ' + part)
+            parts.append(part)
+
+        return ''.join(parts)
+
+    def transcribe_aligned(self, text, escape_links=False, word_cache=False,
+                           lexicon_first=False):
+        """Transcribe text with the tokenized engine, keeping track of where
+        every token ends up. See epa_with_alignment()"""
+
+        if not isinstance(text, str):
+            text = str(text, 'utf-8')
+        if lexicon_first and self.word_table is None:
+            raise AndaluhError('No word table loaded', None)
+
+        parts = [(text, False)] if not escape_links else link_parts(text)
+        spans = array('I')
+        output = []
+        pos = pos_and = 0
+
+        for part, ignored in parts:
+            tokens = [part] if ignored else token_re.split(part)
+            tokens_and = list(tokens)
+            if not ignored:
+                self.transliterate_words(tokens_and, word_cache,
+                                         lexicon_first)
+                self.word_interaction_tokens(tokens_and)
+
+            for token, token_and in zip(tokens, tokens_and):
+                if token:
+                    end = pos + len(token)
+                    end_and = pos_and + len(token_and)
+                    spans.extend((pos, end, pos_and, end_and))
+                    pos, pos_and = end, end_and
+            output.extend(tokens_and)
+
+        return AlignedTranscription(''.join(output), spans)
+
+
+class CountingPattern(object):
+    """Compiled regex wrapper counting the substitutions it makes. Anything
+    else, i.e. match() in the token stream pass, goes to the regex."""
+
+    def __init__(self, pattern, counter):
+        self.pattern = pattern
+        self.counter = counter
+
+    def __getattr__(self, name):
+        return getattr(self.pattern, name)
+
+    def sub(self, repl, string):
+        string, subs = self.pattern.subn(repl, string)
+        self.counter.subs = getattr(self.counter, 'subs', 0) + subs
+        return string
+
+
+# Transcribers are built on first use once per vaf/vvf configuration and
+# reused, so importing andaluh compiles nothing.
+_transcribers = {}
+_lexicon = None
+_word_tables = {}
+_rule_cache = None
+
+
+def get_transcriber(vaf=VAF, vvf=VVF, instrumented=False):
+    """Return the shared EPATranscriber for the given vaf/vvf"""
+
+    key = (vaf, vvf, instrumented)
+    transcriber = _transcribers.get(key)
+    if transcriber is None:
+        transcriber = _transcribers.setdefault(
+            key, EPATranscriber(vaf, vvf, instrumented=instrumented,
+                                lexicon=_lexicon,
+                                word_table=_word_tables.get((vaf, vvf)),
+                                rule_cache=_rule_cache))
+        if _rule_cache is not None:
+            _rule_cache.save()
+    return transcriber
+
+
+def set_lexicon(lexicon):
+    """Use the exceptions of lexicon in the shared transcribers, or only the
+    built-in ones if None. Transcribers are rebuilt when next needed."""
+
+    global _lexicon
+    _lexicon = lexicon
+    _transcribers.clear()
+
+
+def set_rule_cache(rule_cache):
+    """Build the shared transcribers from rule_cache, an andaluh.cache
+    RuleCache, from now on. None builds them from scratch. Transcribers are
+    rebuilt when next needed."""
+
+    global _rule_cache
+    _rule_cache = rule_cache
+    _transcribers.clear()
+
+
+def set_word_table(word_table, vaf=VAF, vvf=VVF):
+    """Use word_table, an ExceptionTable of whole words and their EPA in the
+    given vaf/vvf, in the shared transcribers for epa(..., vaf, vvf,
+    lexicon_first=True). None drops it. Transcribers are rebuilt when next
+    needed."""
 
-        if debug:
-            print('escapeLinks => ' + text)
-        text_and = transliterate(text)
-        for tag in tags:
-            text_and = text_and.replace(tag[0], tag[1])
-        if debug:
-            print('unEscapeLinks => ' + text_and)
-        return text_and
+    if word_table is None:
+        _word_tables.pop((vaf, vvf), None)
     else:
-        return transliterate(text)
+        _word_tables[(vaf, vvf)] = word_table
+    _transcribers.clear()
+
+
+def shared_config():
+    """(lexicon, {(vaf, vvf): word_table}, rule_cache) of the shared
+    transcribers, i.e. to set up worker processes like this one"""
+
+    return _lexicon, dict(_word_tables), _rule_cache
+
+# Rule hooks
+
+
+def add_rule_hook(hook):
+    """Call hook(rule_name, text_in, text_out, elapsed, subs) after every
+    rule run by any transcriber.
+
+    elapsed is the rule wall time in seconds and subs the number of
+    substitutions it made. subs is None for non instrumented transcribers,
+    epa() switches to instrumented ones while there are hooks."""
+
+    rule_hooks.append(hook)
+
+
+def remove_rule_hook(hook):
+    rule_hooks.remove(hook)
+
+
+def print_rule(rule_name, text_in, text_out, elapsed, subs):
+    """Rule hook printing every intermediate text, used by debug mode"""
+    print(rule_name + ' => ' + text_out)
+
+
+class RuleProfiler(object):
+    """Per rule statistics aggregated across transcriptions.
+
+    Use it as a context manager, or register it with add_rule_hook():
+
+        with RuleProfiler() as profiler:
+            epa(text)
+        profiler.stats()
+
+    For each rule it records the number of calls, the total wall time in
+    seconds, the substitutions made and the input and output length in
+    chars. collector, if given, is also called with the same arguments as
+    any rule hook, i.e. to feed an external stats collector."""
+
+    def __init__(self, collector=None):
+        self.collector = collector
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def __call__(self, rule_name, text_in, text_out, elapsed, subs):
+        with self._lock:
+            stats = self._stats.get(rule_name)
+            if stats is None:
+                stats = self._stats[rule_name] = {
+                    'calls': 0, 'time': 0.0, 'subs': 0,
+                    'chars_in': 0, 'chars_out': 0}
+            stats['calls'] += 1
+            stats['time'] += elapsed
+            stats['subs'] += subs or 0
+            stats['chars_in'] += len(text_in)
+            stats['chars_out'] += len(text_out)
+
+        if self.collector:
+            self.collector(rule_name, text_in, text_out, elapsed, subs)
+
+    def __enter__(self):
+        add_rule_hook(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        remove_rule_hook(self)
+
+    def stats(self):
+        """Copy of the statistics, as {rule_name: {stat: value}}"""
+        with self._lock:
+            return {rule_name: dict(stats)
+                    for rule_name, stats in self._stats.items()}
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+# EPA replacement functions. Kept for backwards compatibility, they run a
+# single rule with the shared transcriber.
+
+
+def h_rules(text):
+    """Supress mute /h/"""
+    return get_transcriber().h_rules(text)
+
+
+def x_rules(text, vaf=VAF):
+    """Replacement rules for /ks/ with EPA VAF"""
+    return get_transcriber(vaf=vaf).x_rules(text)
+
+
+def ch_rules(text):
+    """Replacement rules for /∫/ (voiceless postalveolar fricative)"""
+    return get_transcriber().ch_rules(text)
+
+
+def gj_rules(text, vvf=VVF):
+    """Replacing /x/ (voiceless postalveolar fricative) with /h/"""
+    return get_transcriber(vvf=vvf).gj_rules(text)
+
+
+def v_rules(text):
+    """Replacing all /v/ (Voiced labiodental fricative) with /b/"""
+    return get_transcriber().v_rules(text)
+
+
+def ll_rules(text):
+    """Replace ll digraph."""
+    return get_transcriber().ll_rules(text)
+
+
+def l_rules(text):
+    """Rotating /l/ with /r/"""
+    return get_transcriber().l_rules(text)
+
+
+def psico_pseudo_rules(text):
+    """Drops /p/ for pseudo- or psico- prefixes"""
+    return get_transcriber().psico_pseudo_rules(text)
+
+
+def vaf_rules(text, vaf=VAF):
+    """Replacing Voiceless alveolar fricative (vaf) /s/ /θ/ with EPA's ç/Ç"""
+    return get_transcriber(vaf=vaf).vaf_rules(text)
+
+
+def digraph_rules(text):
+    """Replacement of consecutive consonant with EPA VAF"""
+    return get_transcriber().digraph_rules(text)
+
+
+def word_ending_rules(text):
+    return get_transcriber().word_ending_rules(text)
+
+
+def exception_rules(text):
+    """Set of exceptions to the replacement algorithm"""
+    return get_transcriber().exception_rules(text)
+
+
+def word_interaction_rules(text):
+    """Contractions and other word interaction rules"""
+    return get_transcriber().word_interaction_rules(text)
+
+# Main function
+
+
+def epa(text, vaf=VAF, vvf=VVF, escape_links=False, debug=False,
+        word_cache=False, engine='regex', lexicon_first=False):
+    return get_transcriber(vaf, vvf, bool(rule_hooks)).transcribe(
+        text, escape_links, debug, word_cache, engine, lexicon_first)
+
+
+def epa_many(texts, vaf=VAF, vvf=VVF, escape_links=False, word_cache=False,
+             engine='regex', lexicon_first=False):
+    """Transcribe a batch of texts, returned as a list in the same order.
+
+    The whole batch shares one transcriber and identical texts are only
+    transcribed once."""
+
+    transcriber = get_transcriber(vaf, vvf, bool(rule_hooks))
+    transcribed = {}
+    result = []
+
+    for text in texts:
+        text_and = transcribed.get(text)
+        if text_and is None:
+            text_and = transcribed[text] = transcriber.transcribe(
+                text, escape_links, word_cache=word_cache, engine=engine,
+                lexicon_first=lexicon_first)
+        result.append(text_and)
+
+    return result
+
+
+def epa_with_alignment(text, vaf=VAF, vvf=VVF, escape_links=False,
+                       word_cache=False, lexicon_first=False):
+    """Transcribe text, also returning where each token of text ends up in
+    the transcription, as an AlignedTranscription(text, spans).
+
+    spans is an array('I') of four offsets per token, source start, source
+    end, output start and output end, in order. Words, separators and
+    escaped links are tokens, so the spans cover both texts. The
+    transcription is the same as epa()'s, from the tokenized engine."""
+
+    return get_transcriber(vaf, vvf, bool(rule_hooks)).transcribe_aligned(
+        text, escape_links, word_cache, lexicon_first)
+
+
+def epa_stream(chunks, vaf=VAF, vvf=VVF, escape_links=False,
+               word_cache=False, engine='regex', lexicon_first=False):
+    """Transcribe an iterable of text chunks, i.e. read from a socket or a
+    big file, yielding the transcription as it goes.
+
+    Chunks can be cut anywhere, even mid word or, for bytes, mid character.
+    The text is transcribed in the pieces of split_stream(): only the text
+    after the last safe cut is held back until the next chunk arrives. So
+    memory stays flat as long as the text has such cuts, as prose does, but
+    grows with the longest run without any."""
+
+    transcriber = get_transcriber(vaf, vvf, bool(rule_hooks))
+
+    def decoded():
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        for chunk in chunks:
+            yield chunk if isinstance(chunk, str) else decoder.decode(chunk)
+        yield decoder.decode(b'', final=True)
+
+    for text in split_stream(decoded()):
+        yield transcriber.transcribe(
+            text, escape_links, word_cache=word_cache, engine=engine,
+            lexicon_first=lexicon_first)
+
+
+def __getattr__(name):
+    # Former eagerly built module attributes, now built on first use
+    if name == 'to_ignore_re':
+        return get_to_ignore_re()
+    elif name == 'default_transcriber':
+        return get_transcriber()
+    raise AttributeError(
+        'module %r has no attribute %r' % (__name__, name))
 
 
 class AndaluhError(Exception):
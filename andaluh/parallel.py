@@ -0,0 +1,98 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# vim: ts=4
+###
+#
+# Copyright (c) 2018-2020 Andalugeeks
+# Authors:
+# - Ksar Feui <a.moreno.losana@gmail.com>
+# - J. Félix Ontañón <felixonta@gmail.com>
+# - Sergio Soto <scots4ever@gmail.com>
+
+import os
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from andaluh.defs import VAF, VVF
+from andaluh.lib import (EPATranscriber, epa_many, rule_hooks, set_lexicon,
+                         set_rule_cache, set_word_table, shared_config)
+
+# Lines shipped to a worker process at once.
+CHUNKSIZE = 1000
+
+
+def _epa_chunk(lines, vaf, vvf, escape_links):
+    return epa_many(lines, vaf=vaf, vvf=vvf, escape_links=escape_links)
+
+
+def _configure(lexicon, word_tables, rule_cache):
+    """Pool initializer, workers started with spawn or forkserver do not
+    inherit the shared transcribers setup of the parent"""
+
+    set_lexicon(lexicon)
+    set_rule_cache(rule_cache)
+    for (vaf, vvf), word_table in word_tables.items():
+        set_word_table(word_table, vaf, vvf)
+
+
+def _chunks(iterable, chunksize):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, chunksize))
+        if not chunk:
+            return
+        yield chunk
+
+
+def epa_parallel(iterable, workers=None, chunksize=CHUNKSIZE, vaf=VAF,
+                 vvf=VVF, escape_links=False, lexicon=None):
+    """Transcribe an iterable of texts (i.e. file lines) with a process pool.
+
+    Texts are shipped to the workers in chunks of chunksize and the results
+    are yielded one by one in the input order. Only a couple of chunks per
+    worker are in flight at any time, so the input is consumed lazily and
+    memory stays flat regardless of its size. workers defaults to the number
+    of CPUs.
+
+    Workers use the lexicon, word tables and rule cache loaded in this
+    process, or the compiled lexicon at the path lexicon instead, without
+    loading it here for later epa() calls."""
+
+    workers = workers or os.cpu_count() or 1
+    chunks = _chunks(iterable, chunksize)
+    shared_lexicon, word_tables, rule_cache = shared_config()
+
+    if lexicon:
+        from andaluh.lexicon import Lexicon
+        lexicon = Lexicon(lexicon)
+    else:
+        lexicon = shared_lexicon
+
+    if workers == 1:
+        if lexicon is shared_lexicon:
+            for chunk in chunks:
+                yield from _epa_chunk(chunk, vaf, vvf, escape_links)
+            return
+
+        transcriber = EPATranscriber(vaf, vvf, instrumented=bool(rule_hooks),
+                                     lexicon=lexicon, rule_cache=rule_cache)
+        for chunk in chunks:
+            for line in chunk:
+                yield transcriber.transcribe(line, escape_links)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_configure,
+                             initargs=(lexicon, word_tables,
+                                       rule_cache)) as executor:
+        pending = deque()
+
+        for chunk in chunks:
+            pending.append(executor.submit(
+                _epa_chunk, chunk, vaf, vvf, escape_links))
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().result()
+
+        while pending:
+            yield from pending.popleft().result()
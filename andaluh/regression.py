@@ -0,0 +1,323 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# vim: ts=4
+###
+#
+# Copyright (c) 2018-2020 Andalugeeks
+# Authors:
+# - Ksar Feui <a.moreno.losana@gmail.com>
+# - J. Félix Ontañón <felixonta@gmail.com>
+# - Sergio Soto <scots4ever@gmail.com>
+
+"""Lemario regression runner.
+
+Transcribes every row of a reference corpus, by default
+tests/lemario_cas_and.csv in a source checkout, and checks it against its
+expected EPA:
+
+    python -m andaluh.regression --baseline baseline.json -o report.json
+
+The corpus is sharded across a pool of worker processes. Every row also
+records the rules which changed it, so the report gives the accuracy per
+rule next to the overall one.
+
+Row results are cached under the user cache dir (see andaluh.cache), keyed
+by the contents of andaluh/defs.py and andaluh/lib.py, so a run with no rule
+change only transcribes new rows. With a baseline, the transcriptions that
+changed since it was saved are listed as fixed, broken or changed."""
+
+import argparse
+import csv
+import json
+import os
+import pickle
+import sys
+import time
+import zlib
+
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from pathlib import Path
+
+from andaluh import defs, lib
+from andaluh.cache import cache_dir, dump_pickle
+from andaluh.defs import VAF, VVF
+
+# Only in a source checkout, it is not installed with the package
+LEMARIO = Path(__file__).parent.parent / 'tests' / 'lemario_cas_and.csv'
+
+# Words shipped to a worker process at once
+SHARD_SIZE = 2000
+# Rows no rule changed are accounted under this name in the rule stats
+NO_RULE = 'none'
+
+
+def read_corpus(path=LEMARIO, source='cas', target='and'):
+    """(source, target) rows of a CSV with source and target columns"""
+
+    with open(path, encoding='utf-8', newline='') as fh:
+        return [(row[source], row[target]) for row in csv.DictReader(fh)]
+
+
+def source_key(vaf=VAF, vvf=VVF):
+    """Checksum of the rules, the vaf/vvf and the defs the results depend
+    on"""
+
+    key = zlib.crc32(repr((vaf, vvf)).encode('utf-8'))
+    for path in (defs.__file__, lib.__file__):
+        with open(path, 'rb') as fh:
+            key = zlib.crc32(fh.read(), key)
+    return '%08x' % key
+
+
+def transcribe_shard(words, vaf=VAF, vvf=VVF):
+    """[(transcription, names of the rules which changed it)] of words"""
+
+    # As EPATranscriber.apply_rules(), without the hooks timing overhead
+    rules = lib.get_transcriber(vaf, vvf).rules
+
+    results = []
+    for word in words:
+        if not word:
+            # As transcribe(), no rule runs on an empty text
+            results.append((word, ()))
+            continue
+        fired = []
+        text = word
+        for rule in rules:
+            text_out = rule(text)
+            if text_out != text:
+                fired.append(rule.__name__)
+                text = text_out
+        results.append((text, tuple(fired)))
+    return results
+
+
+class ResultCache(object):
+    """Per word (transcription, rules) results of a vaf/vvf, stored under
+    cache_dir() and dropped whenever source_key() changes"""
+
+    def __init__(self, vaf=VAF, vvf=VVF, path=None):
+        self.path = path or os.path.join(cache_dir(), 'regression.pickle')
+        self.section = (vaf, vvf)
+        self.key = source_key(vaf, vvf)
+        self.results = {}
+        self.dirty = False
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, 'rb') as fh:
+                self.sections = pickle.load(fh)
+        except FileNotFoundError:
+            self.sections = {}
+            return
+        except Exception:
+            # Corrupt or foreign file, it is rebuilt on save()
+            self.sections = {}
+            self.dirty = True
+            return
+
+        key, results = self.sections.get(self.section, (None, {}))
+        if key == self.key:
+            self.results = results
+
+    def update(self, results):
+        self.results.update(results)
+        self.dirty = True
+
+    def save(self):
+        if not self.dirty:
+            return
+        self.sections[self.section] = (self.key, self.results)
+        dump_pickle(self.sections, self.path)
+        self.dirty = False
+
+
+def _shards(words, size):
+    return [words[i:i + size] for i in range(0, len(words), size)]
+
+
+def _accuracy(stats):
+    stats['accuracy'] = round(stats['ok'] / stats['total'], 6) \
+        if stats['total'] else 0.0
+    return stats
+
+
+def run_regression(rows, vaf=VAF, vvf=VVF, workers=None, cache=True,
+                   cache_path=None, baseline=None, shard_size=SHARD_SIZE):
+    """Transcribe the (source, expected) rows and compare them against the
+    expected EPA, returning a JSON serializable report.
+
+    Words missing from the result cache, unless cache is False, are
+    transcribed in shards of shard_size by workers processes, by default
+    one per CPU. baseline is a {source: transcription} dict of a previous
+    run, see baseline_of()."""
+
+    start = time.perf_counter()
+    result_cache = ResultCache(vaf, vvf, cache_path) if cache else None
+    results = dict(result_cache.results) if cache else {}
+
+    cached = sum(1 for word, _ in rows if word in results)
+    missing = list(dict.fromkeys(
+        word for word, _ in rows if word not in results))
+    shards = _shards(missing, shard_size)
+    workers = min(workers or os.cpu_count() or 1, len(shards)) or 1
+
+    if workers == 1:
+        transcribed = [transcribe_shard(shard, vaf, vvf) for shard in shards]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            transcribed = list(executor.map(
+                transcribe_shard, shards, repeat(vaf), repeat(vvf)))
+
+    new = {word: result for shard, shard_results in zip(shards, transcribed)
+           for word, result in zip(shard, shard_results)}
+    results.update(new)
+    if result_cache is not None and new:
+        result_cache.update(new)
+        result_cache.save()
+
+    summary = {'total': 0, 'ok': 0, 'fail': 0}
+    rules = {}
+    failures = []
+    changed = []
+    for word, expected in rows:
+        text_and, fired = results[word]
+        ok = text_and == expected
+
+        summary['total'] += 1
+        summary['ok' if ok else 'fail'] += 1
+        for rule_name in fired or (NO_RULE,):
+            stats = rules.setdefault(
+                rule_name, {'total': 0, 'ok': 0, 'fail': 0})
+            stats['total'] += 1
+            stats['ok' if ok else 'fail'] += 1
+
+        if not ok:
+            failures.append({'source': word, 'expected': expected,
+                             'transcription': text_and,
+                             'rules': list(fired)})
+
+        before = baseline.get(word) if baseline is not None else None
+        if before is not None and before != text_and:
+            if text_and == expected:
+                status = 'fixed'
+            elif before == expected:
+                status = 'broken'
+            else:
+                status = 'changed'
+            changed.append({'source': word, 'expected': expected,
+                            'before': before, 'after': text_and,
+                            'status': status})
+
+    _accuracy(summary)
+    summary['cached'] = cached
+    summary['transcribed'] = len(missing)
+    summary['seconds'] = round(time.perf_counter() - start, 3)
+
+    report = {
+        'vaf': vaf,
+        'vvf': vvf,
+        'key': source_key(vaf, vvf),
+        'summary': summary,
+        'rules': {rule_name: _accuracy(stats)
+                  for rule_name, stats in sorted(rules.items())},
+        'failures': failures,
+        'transcriptions': {word: results[word][0] for word, _ in rows},
+    }
+    if baseline is not None:
+        for status in ('fixed', 'broken', 'changed'):
+            summary[status] = sum(
+                1 for change in changed if change['status'] == status)
+        report['changed'] = changed
+    return report
+
+
+def baseline_of(report):
+    """{source: transcription} of a report, as taken by run_regression()"""
+    return report['transcriptions']
+
+
+def read_json(path):
+    with open(path, encoding='utf-8') as fh:
+        return json.load(fh)
+
+
+def write_json(data, path=None):
+    """Dump data as JSON to path, or stdout"""
+    if path:
+        with open(path, 'w', encoding='utf-8') as fh:
+            json.dump(data, fh, ensure_ascii=False, indent=2)
+            fh.write('\n')
+    else:
+        json.dump(data, sys.stdout, ensure_ascii=False, indent=2)
+        sys.stdout.write('\n')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Check the EPA transcription against a reference corpus')
+    if LEMARIO.exists():
+        parser.add_argument('corpus', nargs='?', default=str(LEMARIO),
+                            help='CSV with cas and and columns (default: '
+                                 'the lemario)')
+    else:
+        parser.add_argument('corpus',
+                            help='CSV with cas and and columns. The lemario '
+                                 'default is only there in a source checkout')
+    parser.add_argument('-e', dest='vaf', default=VAF,
+                        choices=['ç', 's', 'z', 'h'],
+                        help='vaf the corpus EPA is written with')
+    parser.add_argument('-j', dest='vvf', action='store_const', const='j',
+                        default=VVF, help='vvf j instead of h')
+    parser.add_argument('--workers', type=int, metavar='N',
+                        help='Worker processes (default: number of CPUs)')
+    parser.add_argument('--no-cache', dest='cache', action='store_false',
+                        help='Transcribe every row, ignoring cached results')
+    parser.add_argument('--baseline', metavar='FILE',
+                        help='Report the transcriptions changed since the '
+                             'baseline FILE, creating it if missing')
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='Overwrite the baseline with this run')
+    parser.add_argument('--min-accuracy', type=float, default=0.0,
+                        help='Exit with error under this accuracy, from 0 '
+                             'to 1')
+    parser.add_argument('--fail-on-broken', action='store_true',
+                        help='Exit with error if any baseline row broke')
+    parser.add_argument('-o', dest='output', metavar='FILE',
+                        help='Write the JSON report to FILE instead of '
+                             'stdout')
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if args.baseline and os.path.exists(args.baseline):
+        baseline = baseline_of(read_json(args.baseline))
+
+    report = run_regression(read_corpus(args.corpus), args.vaf, args.vvf,
+                            args.workers, args.cache, baseline=baseline)
+
+    if args.baseline and (baseline is None or args.update_baseline):
+        write_json({key: report[key] for key in
+                    ('vaf', 'vvf', 'key', 'summary', 'transcriptions')},
+                   args.baseline)
+
+    # The transcriptions are already in the baseline
+    del report['transcriptions']
+    write_json(report, args.output)
+
+    summary = report['summary']
+    print('%(ok)d/%(total)d ok (%(accuracy).2f%%), %(transcribed)d '
+          'transcribed in %(seconds)ss' % dict(
+              summary, accuracy=summary['accuracy'] * 100), file=sys.stderr)
+    if 'changed' in report:
+        print('%(fixed)d fixed, %(broken)d broken, %(changed)d changed '
+              'since the baseline' % summary, file=sys.stderr)
+
+    failed = summary['accuracy'] < args.min_accuracy or (
+        args.fail_on_broken and summary.get('broken'))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,329 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# vim: ts=4
+###
+#
+# Copyright (c) 2018-2020 Andalugeeks
+# Authors:
+# - Ksar Feui <a.moreno.losana@gmail.com>
+# - J. Félix Ontañón <felixonta@gmail.com>
+# - Sergio Soto <scots4ever@gmail.com>
+
+"""HTTP/JSON transcription server, run with `andaluh serve`.
+
+POST /epa with {"text": "..."} or {"texts": ["...", ...]}, plus optional
+"vaf", "vvf" and "escape_links", answers {"text": "..."} or {"texts": [...]}
+in the same order. GET /stats reports throughput, latency and cache
+figures. Texts are transcribed by a pool of worker processes, forked and
+warmed up on start, behind a response cache shared by all requests."""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from andaluh.defs import VAF, VVF
+from andaluh.lib import AndaluhError, epa_many, get_transcriber
+
+VAF_CHOICES = ('ç', 's', 'z', 'h')
+VVF_CHOICES = ('h', 'j')
+
+# Texts of a request shipped to a worker process at once
+CHUNKSIZE = 100
+CACHE_SIZE = 65536
+# Requests the latency percentiles are computed over
+LATENCY_WINDOW = 1000
+MAX_BODY = 16 * 1024 * 1024
+
+
+def _warm_worker(rule_cache, lexicon):
+    if rule_cache:
+        from andaluh.cache import enable_rule_cache
+        enable_rule_cache()
+    if lexicon:
+        from andaluh.lexicon import load_lexicon
+        load_lexicon(lexicon)
+    for vaf in VAF_CHOICES:
+        for vvf in VVF_CHOICES:
+            get_transcriber(vaf, vvf)
+
+
+def _ping():
+    return os.getpid()
+
+
+class ResponseCache(object):
+    """Thread safe LRU cache of transcriptions"""
+
+    def __init__(self, maxsize=CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        if not self.maxsize:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+
+class TranscriptionServer(ThreadingHTTPServer):
+    """Threaded HTTP front end of a pool of transcription processes"""
+
+    daemon_threads = True
+
+    def __init__(self, address, workers=None, cache_size=CACHE_SIZE,
+                 rule_cache=False, lexicon=None, log_requests=True):
+        self.workers = workers or os.cpu_count() or 1
+        self.cache = ResponseCache(cache_size)
+        self.log_requests = log_requests
+
+        # Fork and warm up every worker before listening, so they do not
+        # inherit the server socket
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_warm_worker,
+            initargs=(rule_cache, lexicon))
+        try:
+            for future in [self.executor.submit(_ping)
+                           for _ in range(self.workers)]:
+                future.result()
+            super(TranscriptionServer, self).__init__(
+                address, TranscriptionHandler)
+        except BaseException:
+            self.executor.shutdown()
+            raise
+
+        self.started = time.time()
+        self.requests = 0
+        self.errors = 0
+        self.texts = 0
+        self.chars = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self._lock = threading.Lock()
+
+    def server_close(self):
+        super(TranscriptionServer, self).server_close()
+        self.executor.shutdown()
+
+    def transcribe(self, texts, vaf, vvf, escape_links):
+        """Transcriptions of texts, from the cache or the worker pool"""
+
+        result = [None] * len(texts)
+        pending = {}
+        for i, text in enumerate(texts):
+            text_and = self.cache.get((text, vaf, vvf, escape_links))
+            if text_and is None:
+                pending.setdefault(text, []).append(i)
+            else:
+                result[i] = text_and
+
+        misses = list(pending)
+        chunks = [misses[i:i + CHUNKSIZE]
+                  for i in range(0, len(misses), CHUNKSIZE)]
+        futures = [self.executor.submit(
+            epa_many, chunk, vaf, vvf, escape_links) for chunk in chunks]
+        for chunk, future in zip(chunks, futures):
+            for text, text_and in zip(chunk, future.result()):
+                self.cache.put((text, vaf, vvf, escape_links), text_and)
+                for i in pending[text]:
+                    result[i] = text_and
+
+        return result
+
+    def handle_epa(self, request):
+        """Answer to a POST /epa JSON request"""
+
+        if not isinstance(request, dict):
+            raise AndaluhError('Expected a JSON object', request)
+
+        vaf = request.get('vaf', VAF)
+        vvf = request.get('vvf', VVF)
+        escape_links = bool(request.get('escape_links', False))
+        if vaf not in VAF_CHOICES:
+            raise AndaluhError('Unknown vaf', vaf)
+        if vvf not in VVF_CHOICES:
+            raise AndaluhError('Unknown vvf', vvf)
+
+        if 'texts' in request:
+            texts = request['texts']
+            if not isinstance(texts, list):
+                raise AndaluhError('Expected a list of texts', texts)
+        elif 'text' in request:
+            texts = [request['text']]
+        else:
+            raise AndaluhError('Missing text or texts', request)
+        if not all(isinstance(text, str) for text in texts):
+            raise AndaluhError('Texts must be strings', texts)
+
+        result = self.transcribe(texts, vaf, vvf, escape_links)
+        with self._lock:
+            self.texts += len(texts)
+            self.chars += sum(len(text) for text in texts)
+
+        if 'texts' in request:
+            return {'texts': result}
+        return {'text': result[0]}
+
+    def record(self, latency, error=False):
+        with self._lock:
+            self.requests += 1
+            self.errors += error
+            self.latencies.append(latency)
+
+    def stats(self):
+        """Throughput, latency and cache figures since the server started"""
+
+        with self._lock:
+            uptime = time.time() - self.started
+            latencies = sorted(self.latencies)
+            stats = {
+                'uptime': round(uptime, 3),
+                'workers': self.workers,
+                'requests': self.requests,
+                'errors': self.errors,
+                'texts': self.texts,
+                'chars': self.chars,
+                'texts_per_sec': round(self.texts / uptime, 1),
+                'chars_per_sec': round(self.chars / uptime, 1),
+            }
+
+        if latencies:
+            def percentile(p):
+                return latencies[min(len(latencies) - 1,
+                                     int(len(latencies) * p))]
+
+            stats['latency_ms'] = {
+                'mean': round(statistics.fmean(latencies) * 1e3, 3),
+                'p50': round(percentile(0.50) * 1e3, 3),
+                'p90': round(percentile(0.90) * 1e3, 3),
+                'p99': round(percentile(0.99) * 1e3, 3),
+                'max': round(latencies[-1] * 1e3, 3),
+            }
+
+        stats['cache'] = {
+            'hits': self.cache.hits,
+            'misses': self.cache.misses,
+            'size': len(self.cache),
+            'maxsize': self.cache.maxsize,
+        }
+        return stats
+
+
+class TranscriptionHandler(BaseHTTPRequestHandler):
+
+    server_version = 'andaluh'
+
+    def do_GET(self):  # NOQA: N802
+        if self.path == '/stats':
+            self.send_json(200, self.server.stats())
+        else:
+            self.send_json(404, {'error': 'Not found'})
+
+    def do_POST(self):  # NOQA: N802
+        if self.path != '/epa':
+            self.send_json(404, {'error': 'Not found'})
+            return
+
+        start = time.perf_counter()
+        try:
+            length = self.headers.get('Content-Length', '0')
+            try:
+                length = int(length)
+            except ValueError:
+                raise AndaluhError('Invalid Content-Length', length)
+            if length < 0:
+                raise AndaluhError('Invalid Content-Length', length)
+            elif length > MAX_BODY:
+                raise AndaluhError('Request too large', length)
+            try:
+                request = json.loads(self.rfile.read(length))
+            except ValueError:
+                raise AndaluhError('Invalid JSON', None)
+            response = self.server.handle_epa(request)
+        except AndaluhError as e:
+            self.server.record(time.perf_counter() - start, error=True)
+            self.send_json(400, {'error': str(e)})
+        except Exception as e:
+            # i.e. a broken worker pool
+            self.server.record(time.perf_counter() - start, error=True)
+            self.log_error('%r', e)
+            self.send_json(500, {'error': 'Internal server error'})
+        else:
+            self.server.record(time.perf_counter() - start)
+            self.send_json(200, response)
+
+    def send_json(self, status, data):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.log_requests:
+            super(TranscriptionHandler, self).log_message(format, *args)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='andaluh serve',
+        description='Serve Andalûh EPA transliteration over HTTP/JSON.')
+    parser.add_argument('--host', default='127.0.0.1',
+                        help='Address to listen on (default: %(default)s)')
+    parser.add_argument('--port', type=int, default=8000,
+                        help='Port to listen on (default: %(default)s)')
+    parser.add_argument('--workers', type=int, metavar='N',
+                        help='Worker processes (default: number of CPUs)')
+    parser.add_argument('--cache-size', type=int, default=CACHE_SIZE,
+                        metavar='N',
+                        help='Transcriptions kept in the response cache, 0 '
+                             'disables it (default: %(default)s)')
+    parser.add_argument('--lexicon', metavar='FILE',
+                        help='Extra rule exceptions from a compiled lexicon')
+    parser.add_argument('--rule-cache', action='store_true',
+                        help='Load the compiled rules from the user cache '
+                             'dir')
+    args = parser.parse_args(argv)
+
+    server = TranscriptionServer(
+        (args.host, args.port), args.workers, args.cache_size,
+        args.rule_cache, args.lexicon)
+    print('Serving andaluh on http://%s:%d with %d workers' % (
+        args.host, server.server_port, server.workers), file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
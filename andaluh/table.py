@@ -0,0 +1,338 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# vim: ts=4
+###
+#
+# Copyright (c) 2018-2020 Andalugeeks
+# Authors:
+# - Ksar Feui <a.moreno.losana@gmail.com>
+# - J. Félix Ontañón <felixonta@gmail.com>
+# - Sergio Soto <scots4ever@gmail.com>
+
+"""Precomputed transcription tables.
+
+The transcription of every word of a word list, for every vaf/vvf, is
+computed once with the rules and stored in a compact binary table:
+
+    python -m andaluh.table words.txt words.table --jobs 8
+
+Once loaded with load_transcription_table(), epa(..., lexicon_first=True)
+looks every word up in it and only runs the rules on unknown ones. The
+table is memory-mapped, so all the processes of a host share one copy of it
+through the page cache, and loading it costs the same for any size.
+
+Words are found through an open addressing hash index. The transcriptions
+of each vaf/vvf are front-coded against their word, or flagged as equal to
+the first vaf/vvf one, which most words are. The table is built with the
+rules of the andaluh release which builds it, rebuild it after an
+upgrade."""
+
+import argparse
+import csv
+import mmap
+import os
+import re
+import struct
+import zlib
+
+from collections.abc import Mapping
+from functools import lru_cache
+
+from andaluh.lib import AndaluhError, set_word_table
+from andaluh.parallel import epa_parallel
+
+VARIANTS = tuple((vaf, vvf) for vaf in ('ç', 's', 'z', 'h')
+                 for vvf in ('h', 'j'))
+
+# Little endian layout: magic, header, the utf-8 'vafvvf,...' variant names,
+# then the hash index, a power of two number of uint32 absolute entry
+# offsets, 0 for empty slots, probed linearly from the zlib.crc32() of the
+# word. Then the entries, sorted by word.
+#
+# Entries are the utf-8 word and a \0, then for every variant a flags byte
+# and, unless SAME is set, a byte with the length of the prefix shared with
+# the word, in utf-8 bytes, the rest of the transcription and a \0.
+MAGIC = b'ANDTAB\x00\x01'
+HEADER = struct.Struct('<III')  # words, index slots, variant names size
+OFFSET = struct.Struct('<I')
+
+LOOKUP_CACHE_SIZE = 16384
+
+# Transcription entry flags. The capitalized and uppercase forms of the
+# word transcribe like the lowercase one capitalized or uppercased.
+CAPITALIZED = 1
+UPPERCASE = 2
+# Same transcription as in the first variant, nothing else follows
+SAME = 4
+
+word_re = re.compile(r'\w+')
+
+
+def read_words(path, column=None):
+    """Distinct lowercase words of a text file, or of a column of a CSV"""
+
+    words = set()
+    with open(path, encoding='utf-8', newline='') as fh:
+        if column is None:
+            lines = fh
+        else:
+            lines = (row[column] for row in csv.DictReader(fh))
+        for line in lines:
+            words.update(word.lower() for word in word_re.findall(line))
+    return words
+
+
+def _prefix(a, b):
+    size = min(len(a), len(b), 255)
+    i = 0
+    while i < size and a[i] == b[i]:
+        i += 1
+    return i
+
+
+def _capitalize(word):
+    return word[:1].upper() + word[1:]
+
+
+def _transcriptions(words, vaf, vvf, workers):
+    """[(transcription, flags)] of words, checking their cased forms"""
+
+    forms = (form for word in words
+             for form in (word, _capitalize(word), word.upper()))
+    transcribed = epa_parallel(forms, workers, vaf=vaf, vvf=vvf)
+
+    result = []
+    for word_and in transcribed:
+        capitalized, upper = next(transcribed), next(transcribed)
+        flags = 0
+        if capitalized == _capitalize(word_and):
+            flags |= CAPITALIZED
+        if upper == word_and.upper():
+            flags |= UPPERCASE
+        result.append((word_and, flags))
+    return result
+
+
+def compile_transcription_table(words, target, variants=VARIANTS,
+                                workers=None):
+    """Transcribe words with the rules for every vaf/vvf of variants, with
+    workers processes, and write the table to target"""
+
+    words = sorted({word.lower() for word in words
+                    if word_re.fullmatch(word)})
+    entries = [bytearray(word.encode('utf-8') + b'\0') for word in words]
+
+    first = None
+    for vaf, vvf in variants:
+        transcriptions = _transcriptions(words, vaf, vvf, workers)
+        for i, (word_and, flags) in enumerate(transcriptions):
+            if first is not None and first[i][0] == word_and:
+                entries[i].append(flags | SAME)
+            else:
+                key = entries[i][:-1]
+                word_and = word_and.encode('utf-8')
+                prefix = _prefix(key, word_and)
+                entries[i] += (bytes((flags, prefix)) + word_and[prefix:]
+                               + b'\0')
+        if first is None:
+            first = transcriptions
+
+    names = ','.join(vaf + vvf for vaf, vvf in variants).encode('utf-8')
+    # At most half full
+    slots = 1
+    while slots < 2 * len(entries):
+        slots *= 2
+
+    position = len(MAGIC) + HEADER.size + len(names) + OFFSET.size * slots
+    index = [0] * slots
+    for entry in entries:
+        key = bytes(entry[:entry.index(0)])
+        slot = zlib.crc32(key) & (slots - 1)
+        while index[slot]:
+            slot = (slot + 1) & (slots - 1)
+        index[slot] = position
+        position += len(entry)
+
+    with open(target, 'wb') as fh:
+        fh.write(MAGIC)
+        fh.write(HEADER.pack(len(entries), slots, len(names)))
+        fh.write(names)
+        fh.write(struct.pack('<%dI' % slots, *index))
+        fh.writelines(entries)
+
+
+class VariantTable(Mapping):
+    """Transcriptions of one vaf/vvf, backed by the table file.
+
+    Same lookups as lib.ExceptionTable, for epa(..., lexicon_first=True):
+    replace() transcribes lowercase, capitalized and uppercase words, with
+    the case checked when the table was built. Recent lookups are
+    cached."""
+
+    def __init__(self, table, variant):
+        self._table = table
+        self._variant = variant
+        self._lookup = lru_cache(LOOKUP_CACHE_SIZE)(self._search)
+
+    def __reduce__(self):
+        return VariantTable, (self._table, self._variant)
+
+    def _search(self, word):
+        return self._table.lookup(word, self._variant)
+
+    def __len__(self):
+        return len(self._table)
+
+    def __iter__(self):
+        return iter(self._table)
+
+    def __getitem__(self, word):
+        found = self._lookup(word)
+        if found is None:
+            raise KeyError(word)
+        return found[0]
+
+    def replace(self, word):
+        """Transcription of word, or None if it is not in the table or its
+        case may transcribe differently"""
+
+        if word.islower():
+            found = self._lookup(word)
+            return found[0] if found is not None else None
+
+        found = self._lookup(word.lower())
+        if found is None:
+            return None
+        word_and, flags = found
+        if word.isupper():
+            return word_and.upper() if flags & UPPERCASE else None
+        elif word == _capitalize(word.lower()):
+            return _capitalize(word_and) if flags & CAPITALIZED else None
+        return None
+
+
+class TranscriptionTable(object):
+    """Memory-mapped precomputed transcription table"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as fh:
+            if os.fstat(fh.fileno()).st_size < len(MAGIC) + HEADER.size:
+                raise AndaluhError('Not a transcription table', path)
+            self._data = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._data[:len(MAGIC)] != MAGIC:
+            self._data.close()
+            raise AndaluhError('Not a transcription table', path)
+
+        self._count, self._slots, size = HEADER.unpack_from(
+            self._data, len(MAGIC))
+        position = len(MAGIC) + HEADER.size
+        names = self._data[position:position + size].decode('utf-8')
+        self.variants = [(name[:-1], name[-1:])
+                         for name in names.split(',') if name]
+        self._index = position + size
+        self._entries = self._index + OFFSET.size * self._slots
+
+    def __len__(self):
+        return self._count
+
+    def __reduce__(self):
+        # Mapped again from its file, i.e. in a worker process
+        return TranscriptionTable, (self.path,)
+
+    def __iter__(self):
+        data = self._data
+        position = self._entries
+        for _ in range(self._count):
+            end = data.find(b'\0', position)
+            yield data[position:end].decode('utf-8')
+            position = self._skip(end + 1, len(self.variants))
+
+    def _skip(self, position, variants):
+        """Position of the transcription after variants others"""
+        data = self._data
+        for _ in range(variants):
+            if data[position] & SAME:
+                position += 1
+            else:
+                position = data.find(b'\0', position + 2) + 1
+        return position
+
+    def _find(self, key):
+        """Position of the transcriptions of key, ended by a \\0, or None"""
+
+        data = self._data
+        mask = self._slots - 1
+        slot = zlib.crc32(key[:-1]) & mask
+        while True:
+            position, = OFFSET.unpack_from(data, self._index + 4 * slot)
+            if not position:
+                return None
+            end = position + len(key)
+            if data[position:end] == key:
+                return end
+            slot = (slot + 1) & mask
+
+    def lookup(self, word, variant=0):
+        """(transcription, flags) of the lowercase word in the variant-th
+        vaf/vvf, or None"""
+
+        key = word.encode('utf-8') + b'\0'
+        position = self._find(key)
+        if position is None:
+            return None
+
+        data = self._data
+        if variant:
+            start = self._skip(position, variant)
+            flags = data[start]
+            if not flags & SAME:
+                position = start
+        else:
+            flags = data[position]
+        prefix = data[position + 1]
+        end = data.find(b'\0', position + 2)
+        word_and = key[:prefix] + data[position + 2:end]
+        return word_and.decode('utf-8'), flags
+
+    def table(self, vaf, vvf):
+        """VariantTable of vaf/vvf"""
+
+        try:
+            variant = self.variants.index((vaf, vvf))
+        except ValueError:
+            raise AndaluhError('Variant not in the transcription table',
+                               (vaf, vvf))
+        return VariantTable(self, variant)
+
+
+def load_transcription_table(path):
+    """Load a transcription table and use it from now on as the word table
+    of epa(..., lexicon_first=True) and co. for all its vaf/vvf"""
+
+    table = TranscriptionTable(path)
+    for vaf, vvf in table.variants:
+        set_word_table(table.table(vaf, vvf), vaf, vvf)
+    return table
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Build an andaluh precomputed transcription table')
+    parser.add_argument('source', help='Word list, any text file')
+    parser.add_argument('target', help='Transcription table file')
+    parser.add_argument('--column', metavar='NAME',
+                        help='Only read the words of this column of a CSV '
+                             'source, i.e. cas for the lemario')
+    parser.add_argument('--jobs', type=int, metavar='N',
+                        help='Worker processes (default: number of CPUs)')
+    args = parser.parse_args()
+
+    compile_transcription_table(
+        read_words(args.source, args.column), args.target,
+        workers=args.jobs)
+
+
+if __name__ == '__main__':
+    main()
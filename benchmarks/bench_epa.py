@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# vim: ts=4
+###
+#
+# Copyright (c) 2018-2020 Andalugeeks
+# Authors:
+# - Ksar Feui <a.moreno.losana@gmail.com>
+# - J. Félix Ontañón <felixonta@gmail.com>
+# - Sergio Soto <scots4ever@gmail.com>
+
+"""epa() throughput and latency over the lemario and synthetic prose.
+
+Usage: python benchmarks/bench_epa.py [--limit N] [--default-only]
+       [--engine {regex,tokenized}] [--word-cache] [--lexicon-first]
+       [-o FILE]
+"""
+
+import argparse
+import sys
+
+from functools import partial
+
+import andaluh
+
+from andaluh.lexicon import load_word_table
+
+from common import (LEMARIO, VARIANTS, load_lemario, measure, paragraphs,
+                    tweets, write_results)
+
+
+def scenarios(words):
+    return {
+        # One call per lemario entry, mostly single words
+        'lemario': (words, {}),
+        # Long paragraphs of synthetic prose
+        'paragraphs': (paragraphs(words), {}),
+        # Short social media posts with links, mentions and hashtags
+        'tweets': (tweets(words), {'escape_links': True}),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--limit', type=int,
+                        help='Only use the first N lemario entries')
+    parser.add_argument('--default-only', action='store_true',
+                        help='Only benchmark the default vaf/vvf')
+    parser.add_argument('--engine', choices=andaluh.lib.ENGINES,
+                        default='regex', help='Transcription engine')
+    parser.add_argument('--word-cache', action='store_true',
+                        help='Transcribe with the word cache')
+    parser.add_argument('--lexicon-first', action='store_true',
+                        help='Look words up in the lemario before the rules '
+                             '(default vaf/vvf only)')
+    parser.add_argument('-o', dest='output', metavar='FILE',
+                        help='Write JSON results to FILE instead of stdout')
+    args = parser.parse_args()
+
+    words = load_lemario(args.limit)
+    variants = VARIANTS[:1] if args.default_only else VARIANTS
+    if args.lexicon_first:
+        load_word_table(str(LEMARIO))
+        variants = VARIANTS[:1]
+
+    results = {}
+    for name, (texts, params) in scenarios(words).items():
+        results[name] = {}
+        for vaf, vvf in variants:
+            print('%s vaf=%s vvf=%s' % (name, vaf, vvf), file=sys.stderr)
+            func = partial(andaluh.epa, vaf=vaf, vvf=vvf, engine=args.engine,
+                           word_cache=args.word_cache,
+                           lexicon_first=args.lexicon_first, **params)
+            results[name]['%s%s' % (vaf, vvf)] = measure(func, texts)
+
+    write_results('epa', results, args.output)
+
+
+if __name__ == '__main__':
+    main()
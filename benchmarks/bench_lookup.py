@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# vim: ts=4
+###
+#
+# Copyright (c) 2018-2020 Andalugeeks
+# Authors:
+# - Ksar Feui <a.moreno.losana@gmail.com>
+# - J. Félix Ontañón <felixonta@gmail.com>
+# - Sergio Soto <scots4ever@gmail.com>
+
+"""Exception table lookup cost per rule match over the lemario words.
+
+Compares the former per match lookup, word.lower() in list(table.keys())
+plus keep_case(), with the precomputed ExceptionTable.replace().
+
+Usage: python benchmarks/bench_lookup.py [--limit N] [-o FILE]
+"""
+
+import argparse
+import re
+import time
+
+from andaluh import defs, lib
+
+from common import load_lemario, write_results
+
+TABLES = [
+    'H_RULES_EXCEPT',
+    'GJ_RULES_EXCEPT',
+    'V_RULES_EXCEPT',
+    'LL_RULES_EXCEPT',
+    'WORDEND_D_RULES_EXCEPT',
+    'WORDEND_S_RULES_EXCEPT',
+    'WORDEND_CONST_RULES_EXCEPT',
+    'WORDEND_D_INTERVOWEL_RULES_EXCEPT',
+    'ENDING_RULES_EXCEPTION',
+]
+
+
+def list_lookup(table, word):
+    if word.lower() in list(table.keys()):
+        return lib.keep_case(word, table[word.lower()])
+
+
+def timed(func, table, words):
+    start = time.perf_counter()
+    for word in words:
+        func(table, word)
+    return (time.perf_counter() - start) / len(words) * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--limit', type=int,
+                        help='Only use the first N lemario entries')
+    parser.add_argument('-o', dest='output', metavar='FILE',
+                        help='Write JSON results to FILE instead of stdout')
+    args = parser.parse_args()
+
+    words = re.findall(r'\w+', ' '.join(load_lemario(args.limit)))
+    # Same mix of cases the rules see in running text
+    words += [word.title() for word in words[::4]]
+    words += [word.upper() for word in words[::16]]
+
+    results = {}
+    for name in TABLES:
+        table = getattr(defs, name)
+        frozen = lib.ExceptionTable(table)
+        before = timed(list_lookup, table, words)
+        after = timed(lib.ExceptionTable.replace, frozen, words)
+        results[name] = {
+            'entries': len(table),
+            'lookups': len(words),
+            'list_ns': round(before, 1),
+            'table_ns': round(after, 1),
+            'speedup': round(before / after, 2),
+        }
+
+    write_results('lookup', results, args.output)
+
+
+if __name__ == '__main__':
+    main()
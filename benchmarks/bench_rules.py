@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# vim: ts=4
+###
+#
+# Copyright (c) 2018-2020 Andalugeeks
+# Authors:
+# - Ksar Feui <a.moreno.losana@gmail.com>
+# - J. Félix Ontañón <felixonta@gmail.com>
+# - Sergio Soto <scots4ever@gmail.com>
+
+"""Per word replacement cost of the h, gj, v and ll rules.
+
+Compares the former nested re.sub() per matched word with the current
+string operations or single pass, over the lemario words each rule
+matches, then times the whole rules over h-heavy, v-heavy, ll-heavy and
+j-heavy prose.
+
+Usage: python benchmarks/bench_rules.py [--limit N] [-o FILE]
+"""
+
+import argparse
+import re
+import time
+
+from andaluh import lib
+
+from common import load_lemario, paragraphs, write_results
+
+iu = re.IGNORECASE | re.UNICODE
+h_char_re = re.compile(r'(?<!c)(h)(\w?)', re.IGNORECASE)
+gj_char_re = re.compile(r'(g|j)(e|i|é|í)', iu)
+j_char_re = re.compile(r'(j)(a|o|u|á|ó|ú)', iu)
+nv_re = re.compile(r'nv', iu)
+ll_re = re.compile(r'(l)(l)', re.IGNORECASE)
+
+
+def replace_h_char(match):
+    h_char = match.group(1)
+    next_char = match.group(2)
+
+    if next_char and h_char.isupper():
+        return next_char.upper()
+    elif next_char and h_char.islower():
+        return next_char.lower()
+    else:
+        return ''
+
+
+def nested_h(transcriber, word):
+    return h_char_re.sub(replace_h_char, word)
+
+
+def nested_gj(transcriber, word):
+    vvf = transcriber.vvf
+    word = gj_char_re.sub(
+        lambda match: vvf + match.group(2) if match.group(1).islower()
+        else vvf.upper() + match.group(2), word)
+    return j_char_re.sub(
+        lambda match: vvf + match.group(2) if match.group(1).islower()
+        else vvf.upper() + match.group(2), word)
+
+
+def nested_v(transcriber, word):
+    word = nv_re.sub(lambda match: lib.keep_case(match.group(0), 'mb'), word)
+    return word.replace('v', 'b').replace('V', 'B')
+
+
+def nested_ll(transcriber, word):
+    return ll_re.sub(
+        lambda match: 'Y' if match.group(1).isupper() else 'y', word)
+
+
+def current_gj(transcriber, word):
+    vvf = transcriber.vvf
+    return transcriber._gj_char_re.sub(
+        lambda match: vvf if match.group(0).islower() else vvf.upper(),
+        word)
+
+
+def current_v(transcriber, word):
+    # _replace_v_word() past its exception lookup
+    word = word.replace('nv', 'mb').replace('nV', 'mb')
+    word = word.replace('Nv', 'Mb').replace('NV', 'MB')
+    return word.replace('v', 'b').replace('V', 'B')
+
+
+# rule: (word regex, former, current)
+RULES = {
+    'h_rules': ('_h_word_re', nested_h,
+                lambda transcriber, word: transcriber._drop_h(word)),
+    'gj_rules': ('_gj_word_re', nested_gj, current_gj),
+    'v_rules': ('_v_word_re', nested_v, current_v),
+    'll_rules': ('_ll_word_re', nested_ll,
+                 lambda transcriber, word: transcriber._replace_ll(word)),
+}
+
+
+def timed(func, *args, repeat=5):
+    """Best of repeat runs, these are short"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def replace_all(replace, transcriber, words):
+    for word in words:
+        replace(transcriber, word)
+
+
+def apply_rule(rule, texts):
+    for text in texts:
+        rule(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--limit', type=int,
+                        help='Only use the first N lemario entries')
+    parser.add_argument('-o', dest='output', metavar='FILE',
+                        help='Write JSON results to FILE instead of stdout')
+    args = parser.parse_args()
+
+    transcriber = lib.get_transcriber()
+    words = re.findall(r'\w+', ' '.join(load_lemario(args.limit)))
+    # Same mix of cases the rules see in running text
+    words += [word.title() for word in words[::4]]
+    words += [word.upper() for word in words[::16]]
+
+    results = {'words': {}, 'prose': {}}
+    for name, (word_re, former, current) in RULES.items():
+        matched = [word for word in words
+                   if getattr(transcriber, word_re).fullmatch(word)]
+        for word in matched:
+            assert former(transcriber, word) == current(transcriber, word)
+        before = timed(replace_all, former, transcriber, matched)
+        after = timed(replace_all, current, transcriber, matched)
+        results['words'][name] = {
+            'words': len(matched),
+            'nested_ns': round(before / len(matched) * 1e9, 1),
+            'current_ns': round(after / len(matched) * 1e9, 1),
+            'speedup': round(before / after, 2),
+        }
+
+    # Whole rules, to compare across releases
+    for letter, name in (('h', 'h_rules'), ('v', 'v_rules'),
+                         ('ll', 'll_rules'), ('j', 'gj_rules')):
+        texts = paragraphs([word for word in words if letter in word.lower()],
+                           count=20)
+        elapsed = timed(apply_rule, getattr(transcriber, name), texts)
+        results['prose']['%s-heavy' % letter] = {
+            'rule': name,
+            'texts': len(texts),
+            'ms_per_text': round(elapsed / len(texts) * 1e3, 3),
+        }
+
+    write_results('rules', results, args.output)
+
+
+if __name__ == '__main__':
+    main()
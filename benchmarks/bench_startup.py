@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# vim: ts=4
+###
+#
+# Copyright (c) 2018-2020 Andalugeeks
+# Authors:
+# - Ksar Feui <a.moreno.losana@gmail.com>
+# - J. Félix Ontañón <felixonta@gmail.com>
+# - Sergio Soto <scots4ever@gmail.com>
+
+"""Cold start cost: import andaluh, first epa() call and a CLI run.
+
+Every sample is a fresh interpreter. The import time is the cumulative
+`python -X importtime` figure of the andaluh package, the others are wall
+clock times. The CLI is also timed with --rule-cache, warmed up first.
+Exits with error if the median import or CLI time goes over its target.
+
+Usage: python benchmarks/bench_startup.py [--runs N] [--max-import-ms MS]
+       [--max-cli-ms MS] [-o FILE]
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+from functools import partial
+from pathlib import Path
+
+from common import write_results
+
+CLI = Path(__file__).parent.parent / 'bin' / 'andaluh'
+
+# Targets on a warm disk cache with bytecode already compiled
+MAX_IMPORT_MS = 25
+MAX_CLI_MS = 100
+
+FIRST_EPA = '''
+import time
+start = time.perf_counter()
+import andaluh
+andaluh.epa('hola')
+print((time.perf_counter() - start) * 1e3)
+'''
+
+
+def import_ms():
+    stderr = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import andaluh'],
+        capture_output=True, text=True, check=True).stderr
+    for line in stderr.splitlines():
+        fields = [field.strip() for field in line.split('|')]
+        if fields[-1] == 'andaluh':
+            return int(fields[1]) / 1e3
+
+
+def first_epa_ms():
+    return float(subprocess.run(
+        [sys.executable, '-c', FIRST_EPA],
+        capture_output=True, text=True, check=True).stdout)
+
+
+def cli_ms(*options):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, str(CLI), 'hola', *options],
+                   capture_output=True, check=True)
+    return (time.perf_counter() - start) * 1e3
+
+
+def stats(func, runs):
+    samples = sorted(func() for _ in range(runs))
+    return {
+        'median_ms': round(statistics.median(samples), 2),
+        'min_ms': round(samples[0], 2),
+        'max_ms': round(samples[-1], 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=20,
+                        help='Fresh interpreters per measurement')
+    parser.add_argument('--max-import-ms', type=float, default=MAX_IMPORT_MS,
+                        help='Median import andaluh target')
+    parser.add_argument('--max-cli-ms', type=float, default=MAX_CLI_MS,
+                        help='Median bin/andaluh "hola" target')
+    parser.add_argument('-o', dest='output', metavar='FILE',
+                        help='Write JSON results to FILE instead of stdout')
+    args = parser.parse_args()
+
+    # Compile the bytecode and fill the rule cache first, they are not part
+    # of a cold start
+    subprocess.run([sys.executable, '-c', 'import andaluh'], check=True)
+    cli_ms('--rule-cache')
+
+    results = {
+        'import': stats(import_ms, args.runs),
+        'first_epa': stats(first_epa_ms, args.runs),
+        'cli': stats(cli_ms, args.runs),
+        'cli_rule_cache': stats(partial(cli_ms, '--rule-cache'), args.runs),
+    }
+    write_results('startup', results, args.output)
+
+    over = []
+    if results['import']['median_ms'] > args.max_import_ms:
+        over.append('import andaluh over %sms' % args.max_import_ms)
+    if results['cli']['median_ms'] > args.max_cli_ms:
+        over.append('bin/andaluh "hola" over %sms' % args.max_cli_ms)
+    for message in over:
+        print(message, file=sys.stderr)
+
+    sys.exit(1 if over else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# vim: ts=4
+###
+#
+# Copyright (c) 2018-2020 Andalugeeks
+# Authors:
+# - Ksar Feui <a.moreno.losana@gmail.com>
+# - J. Félix Ontañón <felixonta@gmail.com>
+# - Sergio Soto <scots4ever@gmail.com>
+
+"""Plain alternation vs trie regex scan time as the word list grows.
+
+Builds the exception_rules regex, \\b(word|...)\\b, over the first N lemario
+words with '|'.join() and with trie_regex(), and times a search over
+synthetic paragraphs.
+
+Usage: python benchmarks/bench_trie.py [--sizes N,N,...] [-o FILE]
+"""
+
+import argparse
+import re
+import time
+
+from andaluh import defs, lib
+
+from common import load_lemario, paragraphs, write_results
+
+
+def timed(regex, texts):
+    start = time.perf_counter()
+    for text in texts:
+        regex.sub(lambda match: match.group(1), text)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='47,1000,10000',
+                        help='Comma separated word list sizes')
+    parser.add_argument('-o', dest='output', metavar='FILE',
+                        help='Write JSON results to FILE instead of stdout')
+    args = parser.parse_args()
+
+    lemario = load_lemario()
+    texts = paragraphs(lemario, count=10)
+    vocabulary = list(defs.ENDING_RULES_EXCEPTION)
+    vocabulary += [word.lower() for word in lemario if word.isalpha()]
+
+    results = {}
+    for size in (int(size) for size in args.sizes.split(',')):
+        words = list(dict.fromkeys(vocabulary))[:size]
+        flat = re.compile(
+            r'\b(' + '|'.join(words) + r')\b', re.IGNORECASE | re.UNICODE)
+        trie = re.compile(
+            r'\b(' + lib.trie_regex(words) + r')\b',
+            re.IGNORECASE | re.UNICODE)
+        before = timed(flat, texts)
+        after = timed(trie, texts)
+        results[str(len(words))] = {
+            'alternation_s': round(before, 4),
+            'trie_s': round(after, 4),
+            'speedup': round(before / after, 2),
+        }
+
+    write_results('trie', results, args.output)
+
+
+if __name__ == '__main__':
+    main()
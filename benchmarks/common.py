@@ -0,0 +1,128 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# vim: ts=4
+###
+#
+# Copyright (c) 2018-2020 Andalugeeks
+# Authors:
+# - Ksar Feui <a.moreno.losana@gmail.com>
+# - J. Félix Ontañón <felixonta@gmail.com>
+# - Sergio Soto <scots4ever@gmail.com>
+
+"""Shared helpers for the andaluh benchmarks."""
+
+import csv
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+
+from datetime import datetime, timezone
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+
+LEMARIO = Path(__file__).parent.parent / 'tests' / 'lemario_cas_and.csv'
+
+# vaf/vvf combinations supported by bin/andaluh
+VARIANTS = [(vaf, vvf) for vaf in ('ç', 's', 'z', 'h') for vvf in ('h', 'j')]
+
+
+def load_lemario(limit=None):
+    """Castilian column of the lemario, optionally only the first rows"""
+    with open(LEMARIO, encoding='utf-8') as fh:
+        words = [row['cas'] for row in csv.DictReader(fh)]
+    return words[:limit] if limit else words
+
+
+def paragraphs(words, count=50, length=400, seed=1):
+    """Synthetic prose: paragraphs of length lemario words with punctuation"""
+    rnd = random.Random(seed)
+    result = []
+    for _ in range(count):
+        sentence = []
+        for i in range(length):
+            word = rnd.choice(words)
+            if i % 12 == 11:
+                word += rnd.choice('.,;:')
+            sentence.append(word)
+        result.append(' '.join(sentence).capitalize() + '.')
+    return result
+
+
+def tweets(words, count=2000, seed=2):
+    """Synthetic short social media posts with mentions, hashtags and links"""
+    rnd = random.Random(seed)
+    extras = ['@andaluh', '#andalûh', 'https://andaluh.es/transcriptor',
+              'www.google.es', 'info@andaluh.es', 'XIV']
+    result = []
+    for _ in range(count):
+        post = rnd.sample(words, rnd.randint(5, 20))
+        for _ in range(rnd.randint(1, 3)):
+            post.insert(rnd.randrange(len(post) + 1), rnd.choice(extras))
+        result.append(' '.join(post))
+    return result
+
+
+def percentile(quantiles, p):
+    return round(quantiles[p - 1], 3)
+
+
+def measure(func, texts):
+    """Call func once per text, returning throughput and latency stats"""
+    latencies = []
+    clock = time.perf_counter
+
+    start = clock()
+    for text in texts:
+        t = clock()
+        func(text)
+        latencies.append((clock() - t) * 1e6)
+    elapsed = clock() - start
+
+    words = sum(len(text.split()) for text in texts)
+    quantiles = statistics.quantiles(latencies, n=100) \
+        if len(latencies) > 1 else latencies * 99
+
+    return {
+        'calls': len(texts),
+        'words': words,
+        'seconds': round(elapsed, 4),
+        'words_per_sec': round(words / elapsed, 1),
+        'calls_per_sec': round(len(texts) / elapsed, 1),
+        'latency_us': {
+            'mean': round(statistics.fmean(latencies), 3),
+            'p50': percentile(quantiles, 50),
+            'p90': percentile(quantiles, 90),
+            'p99': percentile(quantiles, 99),
+            'max': round(max(latencies), 3),
+        },
+    }
+
+
+def metadata():
+    try:
+        andaluh_version = version('andaluh')
+    except PackageNotFoundError:
+        andaluh_version = None
+
+    return {
+        'andaluh': andaluh_version,
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+    }
+
+
+def write_results(name, results, output=None):
+    """Dump results as JSON to output, or stdout"""
+    data = {'benchmark': name, 'meta': metadata(), 'results': results}
+    if output:
+        with open(output, 'w', encoding='utf-8') as fh:
+            json.dump(data, fh, ensure_ascii=False, indent=2)
+            fh.write('\n')
+    else:
+        json.dump(data, sys.stdout, ensure_ascii=False, indent=2)
+        sys.stdout.write('\n')
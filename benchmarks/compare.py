@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# vim: ts=4
+###
+#
+# Copyright (c) 2018-2020 Andalugeeks
+# Authors:
+# - Ksar Feui <a.moreno.losana@gmail.com>
+# - J. Félix Ontañón <felixonta@gmail.com>
+# - Sergio Soto <scots4ever@gmail.com>
+
+"""Compare two benchmark JSON results, i.e. from two releases.
+
+Usage: python benchmarks/compare.py BASELINE.json CURRENT.json
+"""
+
+import argparse
+import json
+import sys
+
+
+def flatten(results, prefix=''):
+    """Yield (name, stats) for every measurement in a results tree"""
+    for key, value in results.items():
+        if 'words_per_sec' in value:
+            yield prefix + key, value
+        else:
+            yield from flatten(value, prefix + key + '/')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('baseline')
+    parser.add_argument('current')
+    parser.add_argument('--threshold', type=float, default=0.9,
+                        help='Exit with error if any ratio drops below it')
+    args = parser.parse_args()
+
+    with open(args.baseline, encoding='utf-8') as fh:
+        baseline = dict(flatten(json.load(fh)['results']))
+    with open(args.current, encoding='utf-8') as fh:
+        current = dict(flatten(json.load(fh)['results']))
+
+    regressions = 0
+    print('%-32s %14s %14s %7s %10s %10s' % (
+        'benchmark', 'base words/s', 'curr words/s', 'ratio',
+        'base p99', 'curr p99'))
+    for name in sorted(baseline.keys() & current.keys()):
+        base, curr = baseline[name], current[name]
+        ratio = curr['words_per_sec'] / base['words_per_sec']
+        regressions += ratio < args.threshold
+        print('%-32s %14.1f %14.1f %6.2fx %10.1f %10.1f' % (
+            name, base['words_per_sec'], curr['words_per_sec'], ratio,
+            base['latency_us']['p99'], curr['latency_us']['p99']))
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# vim: ts=4
+###
+#
+# Copyright (c) 2018-2020 Andalugeeks
+# Authors:
+# - Ksar Feui <a.moreno.losana@gmail.com>
+# - J. Félix Ontañón <felixonta@gmail.com>
+# - Sergio Soto <scots4ever@gmail.com>
+
+import asyncio
+
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+import andaluh
+from andaluh.aio import epa_async, epa_many_async
+
+TEXTS = [
+    'Todo Xenomorfo dice: [haber], que el Éxito y el éxtasis asfixian.\n',
+    'Lleva un Guijarrito el ABuelo, ¡Qué Bueno! ¡para la VERGÜENZA!\n',
+    'VALLA valla, si vas toda de ENVIDIA\n',
+    'Oye sexy psiquiatra @miguel, la #web https://andaluh.es no va\n',
+    '',
+]
+
+LONG_TEXT = ''.join(TEXTS) * 40
+
+
+@pytest.mark.parametrize('task_size', [16, 256, 4096])
+def test_epa_async(task_size):
+    """Long texts are split, transcribed and put back together in order"""
+    result = asyncio.run(epa_async(LONG_TEXT, vaf='s', vvf='j',
+                                   escape_links=True, task_size=task_size))
+    assert result == andaluh.epa(LONG_TEXT, vaf='s', vvf='j',
+                                 escape_links=True)
+
+
+@pytest.mark.parametrize('max_concurrency', [1, 3])
+def test_epa_many_async(max_concurrency):
+    texts = TEXTS * 5 + [LONG_TEXT]
+    result = asyncio.run(epa_many_async(
+        texts, escape_links=True, max_concurrency=max_concurrency,
+        task_size=200))
+    assert result == andaluh.epa_many(texts, escape_links=True)
+
+
+def test_epa_async_bytes():
+    text = TEXTS[0]
+    assert asyncio.run(epa_async(text.encode('utf-8'))) == andaluh.epa(text)
+
+
+def test_epa_many_async_process_executor():
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        result = asyncio.run(epa_many_async(
+            TEXTS * 3, engine='tokenized', executor=executor, task_size=100))
+    assert result == andaluh.epa_many(TEXTS * 3)
+
+
+def test_epa_many_async_empty():
+    assert asyncio.run(epa_many_async([])) == []
@@ -0,0 +1,91 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# vim: ts=4
+###
+#
+# Copyright (c) 2018-2020 Andalugeeks
+# Authors:
+# - Ksar Feui <a.moreno.losana@gmail.com>
+# - J. Félix Ontañón <felixonta@gmail.com>
+# - Sergio Soto <scots4ever@gmail.com>
+
+import os.path
+import re
+
+import pytest
+
+import andaluh
+from andaluh.cache import RuleCache, enable_rule_cache
+from andaluh.lib import EPATranscriber, get_transcriber, set_rule_cache
+
+TEXTS = [
+    'Todo Xenomorfo dice: [haber], que el Éxito y el éxtasis asfixian.',
+    'Lleva un Guijarrito el ABuelo, ¡Qué Bueno! ¡para la VERGÜENZA!',
+    'Oye sexy psiquiatra @miguel, la #web https://andaluh.es no va',
+]
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / 'rules.pickle')
+
+
+@pytest.mark.parametrize('pattern,flags', [
+    (r'(?P<word>\w+)(s)\b', re.IGNORECASE | re.UNICODE),
+    (r'(?<!c)(h)(\w?)', re.IGNORECASE),
+    (r'(gu|gU)(e|i|é|í|E|I|É|Í)', 0),
+])
+def test_rule_cache_compile(cache_path, pattern, flags):
+    """Cached patterns behave like re.compile() ones"""
+    expected = re.compile(pattern, flags)
+    for rule_cache in (RuleCache(cache_path), RuleCache(cache_path)):
+        compiled = rule_cache.compile(pattern, flags)
+        rule_cache.save()
+        assert compiled.pattern == expected.pattern
+        assert compiled.flags == expected.flags
+        assert compiled.groupindex == expected.groupindex
+        for text in TEXTS:
+            assert compiled.findall(text) == expected.findall(text)
+
+
+@pytest.mark.parametrize('vaf,vvf', [('ç', 'h'), ('s', 'j')])
+def test_rule_cache_transcriber(cache_path, vaf, vvf):
+    """Transcribers built from a saved cache do not compile anything"""
+    RuleCache(cache_path)
+    expected = EPATranscriber(vaf, vvf)
+
+    rule_cache = RuleCache(cache_path)
+    EPATranscriber(vaf, vvf, rule_cache=rule_cache)
+    assert rule_cache.dirty
+    rule_cache.save()
+
+    rule_cache = RuleCache(cache_path)
+    transcriber = EPATranscriber(vaf, vvf, rule_cache=rule_cache)
+    assert not rule_cache.dirty
+    for text in TEXTS:
+        assert (transcriber.transcribe(text, escape_links=True) ==
+                expected.transcribe(text, escape_links=True))
+
+
+def test_rule_cache_corrupt_file(cache_path):
+    with open(cache_path, 'wb') as fh:
+        fh.write(b'not a pickle')
+
+    rule_cache = RuleCache(cache_path)
+    assert rule_cache.dirty
+    EPATranscriber(rule_cache=rule_cache)
+    rule_cache.save()
+    assert RuleCache(cache_path).patterns == rule_cache.patterns
+
+
+def test_enable_rule_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv('ANDALUH_CACHE_DIR', str(tmp_path))
+    try:
+        rule_cache = enable_rule_cache()
+        assert andaluh.epa('Hola') == 'Ola'
+        assert get_transcriber()._h_word_re.pattern in {
+            pattern for pattern, flags in rule_cache.patterns}
+    finally:
+        set_rule_cache(None)
+    assert [path.name for path in tmp_path.iterdir()] == [
+        os.path.basename(rule_cache.path)]
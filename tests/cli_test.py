@@ -0,0 +1,64 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# vim: ts=4
+###
+#
+# Copyright (c) 2018-2020 Andalugeeks
+# Authors:
+# - Ksar Feui <a.moreno.losana@gmail.com>
+# - J. Félix Ontañón <felixonta@gmail.com>
+# - Sergio Soto <scots4ever@gmail.com>
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+import andaluh
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ANDALUH = os.path.join(ROOT, 'bin', 'andaluh')
+
+TEXT = ('Todo Xenomorfo dice: [haber], que el Éxito y el éxtasis asfixian.\n'
+        'Lleva un Guijarrito el ABuelo, ¡Qué Bueno! ¡para la VERGÜENZA!\n')
+
+
+def andaluh_cli(*args, stdin=None, **environ):
+    env = dict(os.environ, PYTHONPATH=ROOT, **environ)
+    return subprocess.run([sys.executable, ANDALUH] + list(args),
+                          input=stdin, capture_output=True, env=env,
+                          encoding='utf-8', check=True).stdout
+
+
+def test_cli_text():
+    assert andaluh_cli('-e', 's', 'Hola, el perro') == 'Ola, er perro\n'
+    assert andaluh_cli('') == '\n'
+
+
+@pytest.mark.parametrize('args,params', [
+    ([], {}),
+    (['-e', 's', '-j'], {'vaf': 's', 'vvf': 'j'}),
+    (['-i', '-', '-e', 'z'], {'vaf': 'z'}),
+])
+def test_cli_piped(args, params):
+    """Piped stdin is transliterated whatever the options"""
+    expected = andaluh.epa(TEXT, escape_links=True, **params)
+    assert andaluh_cli(*args, stdin=TEXT) == expected
+
+
+def test_cli_piped_output(tmp_path):
+    output = tmp_path / 'out.txt'
+    assert andaluh_cli('-o', str(output), stdin=TEXT) == ''
+    assert output.read_text(encoding='utf-8') == \
+        andaluh.epa(TEXT, escape_links=True)
+
+
+@pytest.mark.parametrize('value,enabled', [
+    ('1', True), ('yes', True), ('', False), ('0', False), ('false', False),
+    ('No', False),
+])
+def test_cli_rule_cache_environ(tmp_path, value, enabled):
+    assert andaluh_cli('Hola', ANDALUH_RULE_CACHE=value,
+                       ANDALUH_CACHE_DIR=str(tmp_path)) == 'Ola\n'
+    assert bool(os.listdir(str(tmp_path))) == enabled
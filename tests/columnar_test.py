@@ -0,0 +1,139 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# vim: ts=4
+###
+#
+# Copyright (c) 2018-2020 Andalugeeks
+# Authors:
+# - Ksar Feui <a.moreno.losana@gmail.com>
+# - J. Félix Ontañón <felixonta@gmail.com>
+# - Sergio Soto <scots4ever@gmail.com>
+
+import pytest
+
+import andaluh
+from andaluh.columnar import epa_column
+from andaluh.lexicon import compile_lexicon, load_lexicon
+from andaluh.lib import AndaluhError, set_lexicon
+
+TEXTS = ['Todo Xenomorfo dice: [haber]', 'Lleva un Guijarrito el ABuelo',
+         'VALLA valla, si vas toda de ENVIDIA', 'Todo Xenomorfo dice: [haber]',
+         'Oye @miguel, la #web https://andaluh.es', '']
+
+
+def expected(texts, **kwargs):
+    return [None if text is None else andaluh.epa(text, **kwargs)
+            for text in texts]
+
+
+def test_pandas_column():
+    pandas = pytest.importorskip('pandas')
+
+    series = pandas.Series(TEXTS + [None], index=range(10, 17), name='text')
+    result = epa_column(series)
+    assert result.name == 'text'
+    assert list(result.index) == list(series.index)
+    assert result[:-1].tolist() == expected(TEXTS)
+    assert result.isna().tolist() == [False] * len(TEXTS) + [True]
+
+
+@pytest.mark.parametrize('dtype', ['object', 'string', 'category'])
+def test_pandas_column_dtypes(dtype):
+    pandas = pytest.importorskip('pandas')
+
+    series = pandas.Series(['Hola', None, 'feliz', 'Hola'], dtype=dtype)
+    result = epa_column(series, vaf='s', vvf='j', escape_links=True)
+    assert result[[0, 2, 3]].tolist() == ['Ola', 'felîh', 'Ola']
+    assert result.isna().tolist() == [False, True, False, False]
+    if dtype == 'string':
+        assert result.dtype == series.dtype
+
+
+def test_pandas_column_all_null():
+    pandas = pytest.importorskip('pandas')
+
+    assert epa_column(pandas.Series([None, None])).isna().all()
+    assert epa_column(pandas.Series([], dtype=object)).empty
+
+
+def test_arrow_column():
+    pyarrow = pytest.importorskip('pyarrow')
+
+    texts = TEXTS + [None]
+    result = epa_column(pyarrow.array(texts), escape_links=True)
+    assert result.type == pyarrow.string()
+    assert result.to_pylist() == expected(texts, escape_links=True)
+
+    result = epa_column(pyarrow.array(texts, type=pyarrow.large_string()))
+    assert result.type == pyarrow.large_string()
+    assert result.to_pylist() == expected(texts)
+
+    result = epa_column(pyarrow.array(texts).dictionary_encode())
+    assert result.to_pylist() == expected(texts)
+
+
+def test_arrow_chunked_column():
+    pyarrow = pytest.importorskip('pyarrow')
+
+    chunks = [TEXTS[:3], [None], TEXTS[3:]]
+    result = epa_column(pyarrow.chunked_array(chunks))
+    assert [len(chunk) for chunk in result.chunks] == [3, 1, 3]
+    assert result.to_pylist() == expected(sum(chunks, []))
+
+
+def test_arrow_column_not_strings():
+    pyarrow = pytest.importorskip('pyarrow')
+
+    with pytest.raises(AndaluhError):
+        epa_column(pyarrow.array([1, 2]))
+
+
+def test_numpy_column():
+    numpy = pytest.importorskip('numpy')
+
+    result = epa_column(numpy.array(TEXTS))
+    assert result.tolist() == expected(TEXTS)
+
+    array = numpy.array(TEXTS[:4], dtype=object).reshape(2, 2)
+    result = epa_column(array)
+    assert result.shape == (2, 2)
+    assert result.ravel().tolist() == expected(TEXTS[:4])
+
+    array = numpy.array(['Hola', None, float('nan'), b'feliz'], dtype=object)
+    result = epa_column(array)
+    assert result[0] == 'Ola' and result[3] == 'felîh'
+    assert result[1] is None and result[2] != result[2]
+
+    with pytest.raises(AndaluhError):
+        epa_column(numpy.arange(3))
+
+
+def test_epa_column_workers():
+    pandas = pytest.importorskip('pandas')
+
+    series = pandas.Series(TEXTS * 3)
+    assert epa_column(series, workers=2).tolist() == expected(TEXTS * 3)
+
+
+@pytest.fixture
+def lexicon(tmp_path):
+    source = tmp_path / 'lexicon.tsv'
+    source.write_text('h\thawaii\thawái\n', encoding='utf-8')
+    compile_lexicon(str(source), str(tmp_path / 'lexicon.idx'))
+    yield load_lexicon(str(tmp_path / 'lexicon.idx'))
+    set_lexicon(None)
+
+
+def test_epa_column_workers_lexicon(lexicon, spawn_pool):
+    """Worker processes use the lexicon loaded here"""
+    pandas = pytest.importorskip('pandas')
+
+    series = pandas.Series(['Hawaii', 'Hola Hawaii'] + TEXTS)
+    result = epa_column(series, workers=2).tolist()
+    assert result == epa_column(series).tolist()
+    assert result[:2] == ['Hawái', 'Ola Hawái']
+
+
+def test_epa_column_unsupported():
+    with pytest.raises(AndaluhError):
+        epa_column(TEXTS)
@@ -0,0 +1,27 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# vim: ts=4
+###
+#
+# Copyright (c) 2018-2020 Andalugeeks
+# Authors:
+# - Ksar Feui <a.moreno.losana@gmail.com>
+# - J. Félix Ontañón <felixonta@gmail.com>
+# - Sergio Soto <scots4ever@gmail.com>
+
+import multiprocessing
+
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import pytest
+
+import andaluh.parallel
+
+
+@pytest.fixture
+def spawn_pool(monkeypatch):
+    """Worker processes which inherit nothing from this one, as on macOS
+    and Windows"""
+    monkeypatch.setattr(andaluh.parallel, 'ProcessPoolExecutor', partial(
+        ProcessPoolExecutor, mp_context=multiprocessing.get_context('spawn')))
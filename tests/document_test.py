@@ -0,0 +1,106 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# vim: ts=4
+###
+#
+# Copyright (c) 2018-2020 Andalugeeks
+# Authors:
+# - Ksar Feui <a.moreno.losana@gmail.com>
+# - J. Félix Ontañón <felixonta@gmail.com>
+# - Sergio Soto <scots4ever@gmail.com>
+
+import random
+
+import pytest
+
+import andaluh
+from andaluh.document import OutputEdit, TranscribedDocument
+from andaluh.lib import AndaluhError
+
+TEXT = ('Todo Xenomorfo dice: [haber], que el Éxito y el éxtasis asfixian, '
+        'si no eres un xilófono Chungo.\nLleva un Guijarrito el ABuelo, '
+        '¡Qué Bueno! ¡para la VERGÜENZA!\nVALLA valla, si vas toda de '
+        'ENVIDIA y el alh cistíneo de www.andaluh.es #porqueseñor')
+
+
+def apply(output, change):
+    return output[:change.start] + change.text + output[change.end:]
+
+
+@pytest.mark.parametrize('segment_size', [1, 16, 256])
+def test_document(segment_size):
+    doc = TranscribedDocument(TEXT, segment_size=segment_size)
+    assert doc.source == TEXT
+    assert len(doc) == len(TEXT)
+    assert doc.transcription == andaluh.epa(TEXT)
+
+
+def test_document_edit():
+    doc = TranscribedDocument('Hola, el perro y el gato')
+    assert doc.transcription == 'Ola, er perro y er gato'
+
+    # Only the changed chars are reported
+    assert doc.edit(0, 4, 'Vaya') == OutputEdit(0, 2, 'Bay')
+    assert doc.transcription == 'Baya, er perro y er gato'
+
+    # The word interaction with the previous word is redone
+    assert doc.edit(9, 14, 'ojo') == OutputEdit(7, 13, 'l oh')
+    assert doc.transcription == 'Baya, el oho y er gato'
+
+    assert doc.delete(12, 22) == OutputEdit(12, 22, '')
+    assert doc.insert(12, ' feliz') == OutputEdit(12, 12, ' felîh')
+    assert doc.source == 'Vaya, el ojo feliz'
+    assert doc.transcription == 'Baya, el oho felîh'
+
+
+def test_document_empty():
+    doc = TranscribedDocument()
+    assert doc.transcription == ''
+    assert doc.insert(0, 'Hola') == OutputEdit(0, 0, 'Ola')
+    assert doc.delete(0, 4) == OutputEdit(0, 3, '')
+    assert doc.transcription == ''
+    assert len(doc) == 0
+
+
+@pytest.mark.parametrize('text,start,end,new', [
+    ('ah perro', 0, 1, 'l'),
+    ('oh perro', 1, 1, 'l'),
+    ('oh  ahH perro', 4, 5, 'L'),
+])
+def test_document_edit_before_mute_h(text, start, end, new):
+    """An l typed before the mute h's ending a word rotates across them"""
+    doc = TranscribedDocument(text, segment_size=1)
+    output = apply(doc.transcription, doc.edit(start, end, new))
+    expected = andaluh.epa(text[:start] + new + text[end:])
+    assert doc.transcription == output == expected
+
+
+@pytest.mark.parametrize('start,end', [(-1, 2), (3, 2), (0, 1000)])
+def test_document_edit_out_of_bounds(start, end):
+    doc = TranscribedDocument('Hola')
+    with pytest.raises(AndaluhError):
+        doc.edit(start, end, 'x')
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_document_random_edits(seed):
+    """Any edit sequence gives the whole text transcription"""
+
+    rnd = random.Random(seed)
+    pieces = ['el ', 'al ', 'l', 'h', 'hh ', ' ', '\n', 'Vergüenza ',
+              'xilófono ', 'feliz, ', '@miguel ', 'XIV ', 'alh ', 'cistíneo ']
+    text = TEXT
+    doc = TranscribedDocument(text, vaf='s', vvf='j', escape_links=True,
+                              segment_size=rnd.choice([4, 32]))
+    output = doc.transcription
+
+    for _ in range(100):
+        start = rnd.randint(0, len(text))
+        end = rnd.randint(start, min(len(text), start + 10))
+        new = ''.join(rnd.choice(pieces) for _ in range(rnd.randint(0, 3)))
+        output = apply(output, doc.edit(start, end, new))
+        text = text[:start] + new + text[end:]
+
+        expected = andaluh.epa(text, vaf='s', vvf='j', escape_links=True)
+        assert doc.source == text
+        assert doc.transcription == output == expected
@@ -9,6 +9,11 @@
 # - J. Félix Ontañón <felixonta@gmail.com>
 # - Sergio Soto <scots4ever@gmail.com>
 
+import re
+import threading
+
+from array import array
+
 import pytest
 
 import andaluh
@@ -42,6 +47,12 @@ def test_case(request):
     ('Oye sexy psiquiatra @miguel, la #web HTTPS://andaluh.es/transcriptor no çale en google.es pero çi en http://google.com?utm=13_123.html #porqueseñor',
      'Oye çêççy çiquiatra @miguel, la #web HTTPS://andaluh.es/transcriptor no çale en google.es pero çi en http://google.com?utm=13_123.html #porqueseñor',
      {'escape_links': True}),
+    ('Escribe a info@andaluh.es el siglo XIV, mis@pepe 123456789 veces',
+     'Êccribe a info@andaluh.es er çiglo XIV, mî@pepe 123456789 beçê',
+     {'escape_links': True}),
+    ('En el código civil del siglo XIX, el ixil y MMXXIV',
+     'En er código çibîh der çiglo XIX, el îççîh y MMXXIV',
+     {'escape_links': True}),
 ])
 def test_case_with_params(request):
     return request.param
@@ -60,3 +71,351 @@ def test_andaluh_transcription_with_params(test_case_with_params):
     result = andaluh.epa(input_text, **params)
     assert result == expected_output, f"Input: {input_text}\nExpected: {expected_output}\nGot: {result}"
 
+
+# Reusable transcriber tests
+def test_transcriber_matches_epa(test_case):
+    """A dedicated EPATranscriber transcribes like epa() does"""
+    input_text, _ = test_case
+    transcriber = andaluh.EPATranscriber(vaf='s', vvf='j')
+    result = transcriber.transcribe(input_text)
+    assert result == andaluh.epa(input_text, vaf='s', vvf='j')
+
+
+# Word cache mode tests
+def test_word_cache_matches_epa(test_case):
+    """Word cache mode transcribes exactly like the full pipeline"""
+    input_text, expected_output = test_case
+    transcriber = andaluh.EPATranscriber()
+    assert transcriber.transcribe(input_text, word_cache=True) == expected_output
+    assert transcriber.transcribe(input_text, word_cache=True) == expected_output
+    info = transcriber.cache_info()
+    assert info.hits >= info.misses > 0
+
+
+def test_word_cache_is_bounded():
+    """The word cache never grows past its size"""
+    transcriber = andaluh.EPATranscriber(word_cache_size=2)
+    transcriber.transcribe('uno dos tres cuatro', word_cache=True)
+    assert transcriber.cache_info().currsize == 2
+    transcriber.cache_clear()
+    assert transcriber.cache_info().currsize == 0
+
+
+# Rule skip tests
+def test_rule_skips(test_case):
+    """Skipping rules whose trigger is not in the text changes nothing"""
+    input_text, expected_output = test_case
+    transcriber = andaluh.EPATranscriber()
+    result = input_text
+    for rule in transcriber.rules:
+        result = rule(result)
+    assert transcriber.apply_rules(transcriber.rules, input_text) == result
+
+
+def test_rule_skip_counters():
+    """Skips are counted per rule, for every rule but exception_rules"""
+    transcriber = andaluh.EPATranscriber()
+    assert transcriber.transcribe('Todo el texto') == 'Tó er têtto'
+    assert transcriber.transcribe('la mía', engine='tokenized') == 'la mía'
+
+    skips = transcriber.skip_info()
+    assert list(skips) == [rule.__name__ for rule in transcriber.rules
+                           if rule.__name__ != 'exception_rules']
+    assert skips['h_rules'] == 3
+    assert skips['ll_rules'] == 3
+    assert skips['word_interaction_rules'] == 0
+    assert skips['vaf_rules'] == 3
+    assert skips['word_ending_rules'] == 2
+
+    transcriber.skip_clear()
+    assert not any(transcriber.skip_info().values())
+
+
+# Batch transcription tests
+def test_epa_many():
+    """epa_many keeps the order and transcribes duplicates the same way"""
+    texts = ['Lleva un Guijarrito', 'Todo Xenomorfo', 'Lleva un Guijarrito', '']
+    result = andaluh.epa_many(texts, vaf='z', vvf='j')
+    assert result == [andaluh.epa(text, vaf='z', vvf='j') for text in texts]
+
+
+def test_epa_many_with_params(test_case_with_params):
+    """epa_many forwards escape_links"""
+    input_text, expected_output, params = test_case_with_params
+    assert andaluh.epa_many([input_text] * 2, **params) == [expected_output] * 2
+
+
+# Split point tests
+def test_split_index(test_case):
+    """Halves split at split_index transcribe like the whole text"""
+    input_text, expected_output = test_case
+    i = andaluh.lib.split_index(input_text)
+    assert 0 < i <= len(input_text)
+    assert andaluh.epa(input_text[:i]) + andaluh.epa(input_text[i:]) == expected_output
+
+
+def test_split_index_keeps_word_interaction():
+    """Never split between a word ending l and the next word"""
+    assert andaluh.lib.split_index('el perro') == 0
+    assert andaluh.lib.split_index('el  perro') == 4
+    assert andaluh.lib.split_index('sin espacios') == 4
+    # Mute h's are dropped before the word interaction rules run
+    assert andaluh.lib.split_index('alh cistíneo') == 0
+    assert andaluh.lib.split_index('ALHH cistíneo') == 0
+    assert andaluh.lib.split_index('bah cistíneo') == 4
+
+
+# Streaming tests
+@pytest.mark.parametrize('size', [1, 3, 7, 64])
+def test_epa_stream(test_case, size):
+    """Streaming chunks of any size transcribes like the whole text"""
+    input_text, expected_output = test_case
+    chunks = [input_text[i:i + size] for i in range(0, len(input_text), size)]
+    assert ''.join(andaluh.epa_stream(chunks)) == expected_output
+
+
+def test_epa_stream_bytes(test_case_with_params):
+    """Byte chunks can be cut in the middle of a character"""
+    input_text, expected_output, params = test_case_with_params
+    data = input_text.encode('utf-8')
+    chunks = [data[i:i + 5] for i in range(0, len(data), 5)]
+    assert ''.join(andaluh.epa_stream(chunks, **params)) == expected_output
+
+
+@pytest.mark.parametrize('chunks,pieces', [
+    (['el', ' perro', ' de', ' papel'], ['el perro ', 'de ', 'papel']),
+    (['papel ', 'papel ', 'casa ', 'x'], ['papel papel casa ', 'x']),
+    (['ah', 'h', 'h', ' de'], ['ahhh ', 'de']),
+    (['alh', 'h', ' de', '  x'], ['alhh de  ', 'x']),
+    (['hh', ' ', '', 'l'], ['hh ', 'l']),
+])
+def test_split_stream(chunks, pieces):
+    assert list(andaluh.lib.split_stream(chunks)) == pieces
+
+
+def test_split_stream_scans_once(monkeypatch):
+    """Text without any cut is not scanned again with every chunk"""
+    scanned = []
+    split_index = andaluh.lib.split_index
+
+    def counting_split_index(text):
+        scanned.append(len(text))
+        return split_index(text)
+
+    monkeypatch.setattr(andaluh.lib, 'split_index', counting_split_index)
+
+    chunks = ['papel '] * 1000
+    assert list(andaluh.lib.split_stream(chunks)) == [''.join(chunks)]
+    assert sum(scanned) < 2 * len(''.join(chunks))
+
+
+# Rule profiling tests
+def test_rule_profiler(test_case):
+    """The profiler aggregates per rule stats without changing the output"""
+    input_text, expected_output = test_case
+    collected = []
+    with andaluh.RuleProfiler(collector=lambda *args: collected.append(args)) as profiler:
+        assert andaluh.epa(input_text) == expected_output
+        assert andaluh.epa(input_text) == expected_output
+    andaluh.epa(input_text)
+
+    stats = profiler.stats()
+    assert list(stats) == [rule.__name__ for rule in andaluh.lib.default_transcriber.rules]
+    assert all(rule['calls'] == 2 for rule in stats.values())
+    assert sum(rule['subs'] for rule in stats.values()) > 0
+    assert stats['h_rules']['chars_in'] == 2 * len(input_text)
+    assert len(collected) == 2 * len(stats)
+    assert not andaluh.lib.rule_hooks
+
+
+def test_rule_profiler_skipped_first_rule():
+    """A thread whose first rules are all skipped, as with no h"""
+    results = []
+
+    def transcribe():
+        with andaluh.RuleProfiler() as profiler:
+            results.append(andaluh.epa('el perro de papel bonito'))
+        results.append(profiler.stats())
+
+    thread = threading.Thread(target=transcribe)
+    thread.start()
+    thread.join()
+    assert results[0] == andaluh.epa('el perro de papel bonito')
+    assert results[1]['h_rules']['subs'] == 0
+    assert sum(rule['subs'] for rule in results[1].values()) > 0
+
+
+@pytest.mark.parametrize('params', [
+    {'engine': 'tokenized'}, {'word_cache': True}])
+def test_rule_profiler_token_stream(test_case, params):
+    """The token stream pass works on instrumented transcribers too"""
+    input_text, expected_output = test_case
+    with andaluh.RuleProfiler() as profiler:
+        assert andaluh.epa(input_text, **params) == expected_output
+    assert profiler.stats()
+
+
+def test_rule_profiler_alignment(test_case):
+    input_text, expected_output = test_case
+    with andaluh.RuleProfiler():
+        result = andaluh.epa_with_alignment(input_text)
+    assert result.text == expected_output
+
+
+def test_debug_prints_rules(capsys):
+    """Debug mode prints the text after every rule"""
+    andaluh.epa('Todo el texto', debug=True)
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0] == 'h_rules => Todo el texto'
+    assert lines[-1] == 'word_interaction_rules => Tó er têtto'
+
+
+# Tokenized engine tests
+def test_tokenized_engine(test_case):
+    """The tokenized engine transcribes like the regex one"""
+    input_text, expected_output = test_case
+    assert andaluh.epa(input_text, engine='tokenized') == expected_output
+
+
+def test_tokenized_engine_with_params(test_case_with_params):
+    """The tokenized engine honours escape_links"""
+    input_text, expected_output, params = test_case_with_params
+    assert andaluh.epa(input_text, engine='tokenized', **params) == expected_output
+
+
+@pytest.mark.parametrize('text', ['el del tal de', 'el atl-al bos', 'papel\tde', 'el  de'])
+def test_tokenized_word_interaction(text):
+    """Word interaction rules on the token stream match the regex ones"""
+    assert andaluh.epa(text, engine='tokenized') == andaluh.epa(text)
+
+
+def test_unknown_engine():
+    with pytest.raises(andaluh.lib.AndaluhError):
+        andaluh.epa('hola', engine='nope')
+
+
+# Alignment tests
+def check_spans(text, text_and, spans):
+    """Spans tile both texts, words mapping to their own transcription"""
+    assert spans.typecode == 'I' and len(spans) % 4 == 0
+    pos = pos_and = 0
+    for i in range(0, len(spans), 4):
+        start, end, start_and, end_and = spans[i:i + 4]
+        assert (start, start_and) == (pos, pos_and)
+        assert end > start
+        pos, pos_and = end, end_and
+    assert (pos, pos_and) == (len(text), len(text_and))
+
+
+def test_epa_with_alignment(test_case):
+    input_text, expected_output = test_case
+    text_and, spans = andaluh.epa_with_alignment(input_text)
+    assert text_and == expected_output
+    check_spans(input_text, text_and, spans)
+
+
+def test_epa_with_alignment_with_params(test_case_with_params):
+    input_text, expected_output, params = test_case_with_params
+    text_and, spans = andaluh.epa_with_alignment(input_text, **params)
+    assert text_and == expected_output
+    check_spans(input_text, text_and, spans)
+
+
+def test_epa_with_alignment_spans():
+    text = 'Hola, el perro de @miguel'
+    aligned = andaluh.epa_with_alignment(text, escape_links=True)
+    assert aligned.text == 'Ola, er perro de @miguel'
+    pairs = [(text[aligned.spans[i]:aligned.spans[i + 1]],
+              aligned.text[aligned.spans[i + 2]:aligned.spans[i + 3]])
+             for i in range(0, len(aligned.spans), 4)]
+    assert pairs == [('Hola', 'Ola'), (', ', ', '), ('el', 'er'), (' ', ' '),
+                     ('perro', 'perro'), (' ', ' '), ('de', 'de'),
+                     (' ', ' '), ('@miguel', '@miguel')]
+
+
+def test_epa_with_alignment_empty():
+    assert andaluh.epa_with_alignment('') == ('', array('I'))
+
+
+# Exception table tests
+@pytest.mark.parametrize('word,replacement', [
+    ('os', 'ô'), ('Os', 'Ô'), ('OS', 'Ô'), ('oS', 'ô'), ('perro', None),
+])
+def test_exception_table(word, replacement):
+    """Exception lookups keep the case of the word"""
+    table = andaluh.lib.ExceptionTable({'os': 'ô'})
+    assert table.replace(word) == replacement
+
+
+def test_exception_table_is_read_only():
+    with pytest.raises(TypeError):
+        andaluh.lib.H_RULES_TABLE['hola'] = 'ola'
+
+
+# Trie regex tests
+@pytest.mark.parametrize('words', [
+    ['os', 'as', 'es'], ['a', 'ab', 'abc', 'ac'], ['c.c', 'c-d', 'cc'],
+    list(andaluh.defs.DIGRAPHS), list(andaluh.defs.ENDING_RULES_EXCEPTION),
+])
+def test_trie_regex(words):
+    """Trie regex matches the same words as the plain alternation"""
+    trie = re.compile('(?:' + andaluh.lib.trie_regex(words) + r')\Z')
+    candidates = set(words)
+    candidates |= {word[:-1] for word in words}
+    candidates |= {word + 'x' for word in words}
+    for candidate in candidates:
+        assert bool(trie.match(candidate)) == (candidate in words)
+
+
+def test_trie_regex_empty():
+    assert re.search(andaluh.lib.trie_regex([]), 'hola') is None
+
+
+# Word replacements, against the former nested re.sub() they replaced
+def former_drop_h(word):
+    def replace_h_char(match):
+        h_char, next_char = match.group(1), match.group(2)
+        if next_char and h_char.isupper():
+            return next_char.upper()
+        elif next_char and h_char.islower():
+            return next_char.lower()
+        return ''
+
+    return re.sub(r'(?<!c)(h)(\w?)', replace_h_char, word, flags=re.I)
+
+
+def former_replace_ll(word):
+    return re.sub(r'(l)(l)', lambda match: 'Y' if match.group(1).isupper()
+                  else 'y', word, flags=re.I)
+
+
+def former_replace_v(word):
+    word = re.sub(r'nv', lambda match: andaluh.lib.keep_case(
+        match.group(0), 'mb'), word, flags=re.I)
+    return word.replace('v', 'b').replace('V', 'B')
+
+
+@pytest.mark.parametrize('word', [
+    'h', 'hh', 'ahh', 'hhh', 'cH', 'Ch', 'CH', 'Chh', 'chH', 'cHh', 'ah',
+    'aH', 'hA', 'Ha', 'HOLA', 'hOLA', 'AlHambra', 'ahí', 'HhA', 'hachís',
+])
+def test_drop_h(word):
+    assert andaluh.EPATranscriber._drop_h(word) == former_drop_h(word)
+
+
+@pytest.mark.parametrize('word', [
+    'll', 'LL', 'Ll', 'lL', 'LlL', 'lLl', 'lll', 'llll', 'LLLL', 'LlLl',
+    'calle', 'CALLE', 'Llave', 'caLLe', 'llLL',
+])
+def test_replace_ll(word):
+    assert andaluh.EPATranscriber._replace_ll(word) == former_replace_ll(word)
+
+
+@pytest.mark.parametrize('word', [
+    'nv', 'nV', 'Nv', 'NV', 'envidia', 'ENVIDIA', 'EnVidia', 'eNVidia',
+    'inVierno', 'vaca', 'VACA',
+])
+def test_replace_v(word):
+    transcriber = andaluh.EPATranscriber()
+    result = transcriber._v_word_re.sub(transcriber._replace_v_word, word)
+    assert result == former_replace_v(word)
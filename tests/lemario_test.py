@@ -2,42 +2,60 @@
 # - J. Félix Ontañón <felixonta@gmail.com>
 # - Sergio Soto <scots4ever@gmail.com>
 
-import csv
 import pprint
-from pathlib import Path
+
+from functools import lru_cache
+
+import pytest
 
 import andaluh
+from andaluh.regression import read_corpus, run_regression
+from andaluh.table import VARIANTS
 
 
-# Función legacy para compatibilidad (opcional)
-def lemario():
-    """Test legacy que muestra estadísticas generales"""
-    file = Path(__file__).parent / "lemario_cas_and.csv"
-    
-    transcription_errors = []
-    stats = {"total": 0, "ok": 0, "fail": 0}
+@lru_cache(maxsize=1)
+def lemario_text():
+    """Las entradas del lemario como texto corrido, con mayúsculas de
+    palabra y de frase, para que también entren las reglas entre palabras"""
+    rows = [source for source, _ in read_corpus()]
+    return ' '.join(row.upper() if i % 7 == 0 else
+                    row.capitalize() if i % 3 == 0 else row
+                    for i, row in enumerate(rows))
 
-    with open(file) as fh:
-        rd = csv.DictReader(fh, delimiter=',')
 
-        for row in rd:
-            caste = row['cas']
-            andal = row['and']
-            trans = andaluh.epa(row['cas'])
+@lru_cache(maxsize=None)
+def lemario_epa(vaf, vvf):
+    return andaluh.epa(lemario_text(), vaf=vaf, vvf=vvf)
 
-            if andal != trans:
-                transcription_errors.append((caste, andal, trans))
-                stats["fail"] += 1
-            else:
-                stats["ok"] += 1
 
-            stats["total"] += 1
-    
+@pytest.mark.parametrize('vaf,vvf', VARIANTS)
+def test_lemario_tokenized_engine(vaf, vvf):
+    """El motor tokenizado transcribe el lemario igual que las regex"""
+    result = andaluh.epa(lemario_text(), vaf=vaf, vvf=vvf, engine='tokenized')
+    assert result == lemario_epa(vaf, vvf)
+
+
+@pytest.mark.parametrize('vaf,vvf', VARIANTS)
+def test_lemario_word_cache(vaf, vvf):
+    """La caché de palabras transcribe el lemario igual que sin ella"""
+    transcriber = andaluh.EPATranscriber(vaf=vaf, vvf=vvf)
+    result = transcriber.transcribe(lemario_text(), word_cache=True)
+    assert result == lemario_epa(vaf, vvf)
+
+
+# Función legacy para compatibilidad (opcional). El informe completo, por
+# regla y frente a una línea base, con: python -m andaluh.regression
+def lemario():
+    """Test legacy que muestra estadísticas generales"""
+    report = run_regression(read_corpus())
+    transcription_errors = report["failures"]
+    stats = {key: report["summary"][key] for key in ("total", "ok", "fail")}
+
     # Solo mostrar errores si los hay
     if transcription_errors:
         print("\nErrores de transcripción encontrados:")
         for error in transcription_errors[:10]:  # Limitar a 10 primeros errores
-            print(f"{error[0]} => Esperado: {error[1]}, Obtenido: {error[2]}")
+            print(f"{error['source']} => Esperado: {error['expected']}, Obtenido: {error['transcription']}")
         if len(transcription_errors) > 10:
             print(f"... y {len(transcription_errors) - 10} errores más")
 
@@ -45,7 +63,7 @@ def lemario():
     pprint.pprint(stats)
     
     # El test pasa si hay al menos un 95% de aciertos
-    success_rate = stats["ok"] / stats["total"] if stats["total"] > 0 else 0
+    success_rate = report["summary"]["accuracy"]
     assert success_rate >= 0.95, f"Tasa de éxito muy baja: {success_rate:.2%}"
 
 if __name__ == "__main__":
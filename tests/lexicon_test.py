@@ -0,0 +1,188 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# vim: ts=4
+###
+#
+# Copyright (c) 2018-2020 Andalugeeks
+# Authors:
+# - Ksar Feui <a.moreno.losana@gmail.com>
+# - J. Félix Ontañón <felixonta@gmail.com>
+# - Sergio Soto <scots4ever@gmail.com>
+
+import os.path
+
+import pytest
+
+import andaluh
+from andaluh.lexicon import (Lexicon, compile_lexicon, load_lexicon,
+                             load_word_table)
+from andaluh.lib import (AndaluhError, EPATranscriber, get_transcriber,
+                         set_lexicon, set_word_table)
+from andaluh.parallel import epa_parallel
+
+LEMARIO = os.path.join(os.path.dirname(__file__), 'lemario_cas_and.csv')
+
+SOURCE = '''# category\tword\treplacement
+h\thawaii\thawái
+ending\tcádî\tcái
+wordend_s\tcactus\tcátu
+'''
+
+
+@pytest.fixture
+def lexicon_path(tmp_path):
+    source = tmp_path / 'lexicon.tsv'
+    source.write_text(SOURCE, encoding='utf-8')
+    target = tmp_path / 'lexicon.idx'
+    compile_lexicon(str(source), str(target))
+    return str(target)
+
+
+@pytest.fixture
+def lexicon(lexicon_path):
+    yield load_lexicon(lexicon_path)
+    set_lexicon(None)
+
+
+def test_lexicon_lookups(lexicon_path):
+    lexicon = Lexicon(lexicon_path)
+    assert len(lexicon) == 3
+    assert dict(lexicon.tables['h']) == {'hawaii': 'hawái'}
+    assert lexicon.table('v') is None
+    assert lexicon.tables['ending'].replace('CÁDÎ') == 'CÁI'
+    assert lexicon.tables['ending'].replace('cádî') == 'cái'
+    assert lexicon.tables['ending'].replace('cádê') is None
+
+
+@pytest.mark.parametrize('text,expected', [
+    ('Hawaii', 'Hawái'),
+    ('CÁDIZ', 'CÁI'),
+    ('Un cactus en Cádiz', 'Un cátu en Cái'),
+    ('Los cactus', 'Lô cátu'),
+])
+def test_epa_with_lexicon(lexicon, text, expected):
+    """Lexicon exceptions win over the rules on both engines"""
+    assert andaluh.epa(text) == expected
+    assert andaluh.epa(text, engine='tokenized') == expected
+
+
+def test_set_lexicon_none_restores_builtins(lexicon):
+    assert andaluh.epa('Cádiz') == 'Cái'
+    set_lexicon(None)
+    assert andaluh.epa('Cádiz') == 'Cádî'
+
+
+def test_transcriber_lexicon(lexicon_path):
+    transcriber = EPATranscriber(lexicon=Lexicon(lexicon_path))
+    assert transcriber.transcribe('Cádiz') == 'Cái'
+    assert andaluh.epa('Cádiz') == 'Cádî'
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_epa_parallel_lexicon(lexicon_path, workers):
+    """The lexicon given is only used for these lines"""
+    lines = ['Hawaii\n', 'Cádiz\n'] * 3
+    result = list(epa_parallel(lines, workers=workers, chunksize=2,
+                               lexicon=lexicon_path))
+    assert result == ['Hawái\n', 'Cái\n'] * 3
+    assert andaluh.epa('Hawaii') == 'Awaii'
+
+
+def test_epa_parallel_shared_lexicon(lexicon, spawn_pool):
+    lines = ['Hawaii\n', 'Cádiz\n'] * 3
+    result = list(epa_parallel(lines, workers=2, chunksize=2))
+    assert result == [andaluh.epa(line) for line in lines]
+    assert result[:2] == ['Hawái\n', 'Cái\n']
+
+
+@pytest.mark.parametrize('line', [
+    'x\thola\tola', 'h\thola', 'h\tla hora\tl\'ora',
+])
+def test_bad_lexicon_source(tmp_path, line):
+    source = tmp_path / 'lexicon.tsv'
+    source.write_text(line + '\n', encoding='utf-8')
+    with pytest.raises(AndaluhError):
+        compile_lexicon(str(source), str(tmp_path / 'lexicon.idx'))
+
+
+def test_not_a_lexicon(tmp_path):
+    path = tmp_path / 'lexicon.idx'
+    path.write_bytes(b'')
+    with pytest.raises(AndaluhError):
+        Lexicon(str(path))
+
+
+def test_big_lexicon(tmp_path):
+    """Every entry of a 100k words lexicon is found"""
+    words = ['palabra%d' % i for i in range(100000)]
+    source = tmp_path / 'lexicon.tsv'
+    source.write_text(''.join('wordend_s\t%s\t%sx\n' % (word, word)
+                              for word in words), encoding='utf-8')
+    compile_lexicon(str(source), str(tmp_path / 'lexicon.idx'))
+
+    table = Lexicon(str(tmp_path / 'lexicon.idx')).tables['wordend_s']
+    assert len(table) == len(words)
+    assert all(table[word] == word + 'x' for word in words[::997])
+    assert table.replace('palabra100000') is None
+
+
+# Lexicon-first word table tests
+WORDS = '''"cas","and"
+"abarcador","abarcaôh"
+"Abraham","Abraam"
+"a capela","a capela"
+'''
+
+
+@pytest.fixture
+def word_table(tmp_path):
+    path = tmp_path / 'words.csv'
+    path.write_text(WORDS, encoding='utf-8')
+    yield load_word_table(str(path))
+    set_word_table(None)
+
+
+def test_read_word_table(word_table):
+    """Single words only, keeping the case of the looked up word"""
+    assert len(word_table) == 2
+    assert word_table.replace('ABARCADOR') == 'ABARCAÔH'
+    assert word_table.replace('abraham') == 'abraam'
+    assert word_table.replace('capela') is None
+
+
+@pytest.mark.parametrize('engine', ['regex', 'tokenized'])
+@pytest.mark.parametrize('word_cache', [False, True])
+def test_lexicon_first(word_table, engine, word_cache):
+    """Known words skip the rules, unknown ones still go through them"""
+    text = 'El abarcador Abraham comía feliz'
+    expected = 'El abarcaôh Abraam comía felîh'
+    transcriber = get_transcriber()
+    transcriber.word_table_clear()
+
+    assert andaluh.epa(text, engine=engine, word_cache=word_cache,
+                       lexicon_first=True) == expected
+    assert andaluh.epa(text) == 'El abarcadôh Abraam comía felîh'
+    assert transcriber.word_table_info() == (2, 3, 2)
+
+
+def test_lexicon_first_other_variant(word_table):
+    """Word tables only apply to the vaf/vvf their EPA is written in"""
+    with pytest.raises(AndaluhError):
+        andaluh.epa('abarcador', vaf='s', lexicon_first=True)
+    assert andaluh.epa('abarcador', vaf='s') == 'abarcadôh'
+
+
+def test_lexicon_first_without_word_table():
+    with pytest.raises(AndaluhError):
+        andaluh.epa('hola', lexicon_first=True)
+
+
+def test_lexicon_first_lemario():
+    """Single words of the lemario transcribe to their EPA"""
+    word_table = load_word_table(LEMARIO)
+    try:
+        words = list(word_table)[::10]
+        result = andaluh.epa_many(words, lexicon_first=True)
+    finally:
+        set_word_table(None)
+    assert result == [word_table[word] for word in words]
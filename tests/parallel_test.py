@@ -0,0 +1,37 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# vim: ts=4
+###
+#
+# Copyright (c) 2018-2020 Andalugeeks
+# Authors:
+# - Ksar Feui <a.moreno.losana@gmail.com>
+# - J. Félix Ontañón <felixonta@gmail.com>
+# - Sergio Soto <scots4ever@gmail.com>
+
+import pytest
+
+import andaluh
+from andaluh.parallel import epa_parallel
+
+LINES = [
+    'Todo Xenomorfo dice: [haber], que el Éxito y el éxtasis asfixian.\n',
+    'Lleva un Guijarrito el ABuelo, ¡Qué Bueno! ¡para la VERGÜENZA!\n',
+    'VALLA valla, si vas toda de ENVIDIA\n',
+    'Oye sexy psiquiatra @miguel, la #web https://andaluh.es no va\n',
+] * 5
+
+
+@pytest.mark.parametrize('workers', [1, 3])
+def test_epa_parallel_keeps_order(workers):
+    """Parallel transcription yields the same lines in the same order"""
+    result = list(epa_parallel(iter(LINES), workers=workers, chunksize=3,
+                               vaf='s', vvf='j', escape_links=True))
+    expected = [andaluh.epa(line, vaf='s', vvf='j', escape_links=True)
+                for line in LINES]
+    assert result == expected
+
+
+def test_epa_parallel_empty_input():
+    """Nothing in, nothing out"""
+    assert list(epa_parallel([], workers=2)) == []
@@ -0,0 +1,138 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# vim: ts=4
+###
+#
+# Copyright (c) 2018-2020 Andalugeeks
+# Authors:
+# - Ksar Feui <a.moreno.losana@gmail.com>
+# - J. Félix Ontañón <felixonta@gmail.com>
+# - Sergio Soto <scots4ever@gmail.com>
+
+import json
+
+import pytest
+
+import andaluh
+from andaluh import regression
+
+ROWS = [
+    ('hola', 'ola'),
+    ('vergüenza', 'bergüença'),
+    ('cardillo', 'cardiyo'),
+    ('feliz', 'felîh'),
+    ('casa', 'caça'),
+    ('a capela', 'a capelaaaa'),
+]
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / 'regression.pickle')
+
+
+def test_regression_report(cache_path):
+    report = regression.run_regression(ROWS, cache_path=cache_path)
+
+    summary = report['summary']
+    assert (summary['total'], summary['ok'], summary['fail']) == (6, 4, 2)
+    assert summary['accuracy'] == round(4 / 6, 6)
+    assert report['transcriptions'] == {
+        word: andaluh.epa(word) for word, _ in ROWS}
+
+    assert report['rules']['h_rules'] == {
+        'total': 1, 'ok': 1, 'fail': 0, 'accuracy': 1.0}
+    assert report['rules'][regression.NO_RULE]['total'] == 1
+    assert [failure['source'] for failure in report['failures']] == [
+        'vergüenza', 'a capela']
+    assert report['failures'][0]['rules'] == ['gj_rules', 'v_rules',
+                                              'vaf_rules']
+
+
+def test_regression_sharded():
+    serial = regression.run_regression(ROWS, workers=1, cache=False)
+    sharded = regression.run_regression(ROWS, workers=2, cache=False,
+                                        shard_size=2)
+    del serial['summary']['seconds'], sharded['summary']['seconds']
+    assert serial == sharded
+
+
+def test_regression_cache(cache_path, monkeypatch):
+    report = regression.run_regression(ROWS[:3], cache_path=cache_path)
+    assert report['summary']['transcribed'] == 3
+
+    report = regression.run_regression(ROWS, cache_path=cache_path)
+    assert report['summary']['cached'] == 3
+    assert report['summary']['transcribed'] == 3
+
+    report = regression.run_regression(ROWS, cache_path=cache_path)
+    assert report['summary']['transcribed'] == 0
+
+    # Rule changes invalidate the cached results
+    monkeypatch.setattr(regression, 'source_key', lambda vaf, vvf: 'new')
+    report = regression.run_regression(ROWS, cache_path=cache_path)
+    assert report['summary']['transcribed'] == 6
+
+
+def test_regression_baseline(cache_path):
+    baseline = regression.baseline_of(
+        regression.run_regression(ROWS, cache_path=cache_path))
+    report = regression.run_regression(ROWS, cache_path=cache_path,
+                                       baseline=baseline)
+    assert report['changed'] == []
+
+    baseline.update(hola='hola', cardillo='cardiyo', casa='caza',
+                    vergüenza='bergüenza')
+    report = regression.run_regression(ROWS, cache_path=cache_path,
+                                       baseline=baseline)
+    assert {change['source']: change['status']
+            for change in report['changed']} == {
+        'hola': 'fixed', 'casa': 'fixed', 'vergüenza': 'changed'}
+
+
+def test_regression_broken(cache_path):
+    rows = [('hacer', 'açêh')]
+    report = regression.run_regression(rows, vaf='s', cache_path=cache_path,
+                                       baseline={'hacer': 'açêh'})
+    assert report['summary']['broken'] == 1
+    assert report['changed'] == [{
+        'source': 'hacer', 'expected': 'açêh', 'before': 'açêh',
+        'after': 'asêh', 'status': 'broken'}]
+
+
+def test_regression_main(tmp_path, monkeypatch):
+    monkeypatch.setenv('ANDALUH_CACHE_DIR', str(tmp_path / 'cache'))
+    corpus = tmp_path / 'corpus.csv'
+    corpus.write_text('"cas","and"\n' + ''.join(
+        '"%s","%s"\n' % row for row in ROWS), encoding='utf-8')
+    baseline = tmp_path / 'baseline.json'
+    output = tmp_path / 'report.json'
+
+    args = [str(corpus), '--baseline', str(baseline), '-o', str(output)]
+    assert regression.main(args) == 0
+    assert json.loads(baseline.read_text())['summary']['total'] == 6
+    assert 'changed' not in json.loads(output.read_text())
+
+    assert regression.main(args + ['--fail-on-broken']) == 0
+    report = json.loads(output.read_text())
+    assert report['summary']['cached'] == 6
+    assert report['changed'] == []
+    assert 'transcriptions' not in report
+
+    assert regression.main(args + ['--min-accuracy', '0.9']) == 1
+
+
+def test_regression_empty_row(cache_path):
+    """An empty cell transcribes to an empty text, as epa() does"""
+    report = regression.run_regression([('', ''), ('hola', 'ola')],
+                                       cache_path=cache_path)
+    assert report['summary']['ok'] == 2
+
+
+def test_regression_main_without_lemario(tmp_path, monkeypatch, capsys):
+    """Installed, there is no default corpus"""
+    monkeypatch.setattr(regression, 'LEMARIO', tmp_path / 'missing.csv')
+    with pytest.raises(SystemExit) as error:
+        regression.main([])
+    assert error.value.code == 2
+    assert 'corpus' in capsys.readouterr().err
@@ -0,0 +1,121 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# vim: ts=4
+###
+#
+# Copyright (c) 2018-2020 Andalugeeks
+# Authors:
+# - Ksar Feui <a.moreno.losana@gmail.com>
+# - J. Félix Ontañón <felixonta@gmail.com>
+# - Sergio Soto <scots4ever@gmail.com>
+
+import json
+import threading
+
+from http.client import HTTPConnection
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+import pytest
+
+import andaluh
+from andaluh.server import ResponseCache, TranscriptionServer
+
+TEXTS = [
+    'Todo Xenomorfo dice: [haber], que el Éxito y el éxtasis asfixian.',
+    'Lleva un Guijarrito el ABuelo, ¡Qué Bueno! ¡para la VERGÜENZA!',
+    'Oye sexy psiquiatra @miguel, la #web https://andaluh.es no va',
+]
+
+
+@pytest.fixture(scope='module')
+def server():
+    server = TranscriptionServer(('127.0.0.1', 0), workers=2,
+                                 log_requests=False)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def request(server, path, data=None, raw=None):
+    url = 'http://127.0.0.1:%d%s' % (server.server_port, path)
+    if data is not None:
+        raw = json.dumps(data).encode('utf-8')
+    try:
+        with urlopen(Request(url, data=raw)) as response:
+            return response.status, json.load(response)
+    except HTTPError as e:
+        return e.code, json.load(e)
+
+
+def test_serve_text(server):
+    status, response = request(server, '/epa', {'text': TEXTS[0]})
+    assert status == 200
+    assert response == {'text': andaluh.epa(TEXTS[0])}
+
+
+def test_serve_texts(server):
+    """Batches keep their order, repeated texts included"""
+    texts = TEXTS * 3 + ['']
+    status, response = request(server, '/epa', {
+        'texts': texts, 'vaf': 's', 'vvf': 'j', 'escape_links': True})
+    assert status == 200
+    assert response == {'texts': andaluh.epa_many(
+        texts, vaf='s', vvf='j', escape_links=True)}
+
+
+@pytest.mark.parametrize('data,raw', [
+    (None, b'{"text": '),
+    ([TEXTS[0]], None),
+    ({'text': 'hola', 'vaf': 'q'}, None),
+    ({'text': 'hola', 'vvf': 'x'}, None),
+    ({'texts': 'hola'}, None),
+    ({'texts': ['hola', 1]}, None),
+    ({'words': ['hola']}, None),
+])
+def test_serve_bad_request(server, data, raw):
+    status, response = request(server, '/epa', data, raw)
+    assert status == 400
+    assert 'error' in response
+
+
+@pytest.mark.parametrize('length', ['-1', 'abc'])
+def test_serve_bad_content_length(server, length):
+    """Answered right away, never waiting on a body"""
+    connection = HTTPConnection('127.0.0.1', server.server_port, timeout=5)
+    connection.putrequest('POST', '/epa')
+    connection.putheader('Content-Length', length)
+    connection.endheaders()
+    response = connection.getresponse()
+    assert response.status == 400
+    assert json.load(response) == {'error': 'Invalid Content-Length'}
+    connection.close()
+
+
+def test_serve_not_found(server):
+    assert request(server, '/nope')[0] == 404
+    assert request(server, '/nope', {'text': 'hola'})[0] == 404
+
+
+def test_serve_stats(server):
+    request(server, '/epa', {'text': 'Cacharro cacharrero'})
+    request(server, '/epa', {'text': 'Cacharro cacharrero'})
+    status, stats = request(server, '/stats')
+    assert status == 200
+    assert stats['workers'] == 2
+    assert stats['requests'] >= 2
+    assert stats['cache']['hits'] >= 1
+    assert set(stats['latency_ms']) == {'mean', 'p50', 'p90', 'p99', 'max'}
+
+
+def test_response_cache_is_bounded():
+    cache = ResponseCache(maxsize=2)
+    for key in 'abc':
+        cache.put(key, key.upper())
+    assert len(cache) == 2
+    assert cache.get('a') is None
+    assert cache.get('c') == 'C'
+    assert (cache.hits, cache.misses) == (1, 1)
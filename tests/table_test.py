@@ -0,0 +1,120 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# vim: ts=4
+###
+#
+# Copyright (c) 2018-2020 Andalugeeks
+# Authors:
+# - Ksar Feui <a.moreno.losana@gmail.com>
+# - J. Félix Ontañón <felixonta@gmail.com>
+# - Sergio Soto <scots4ever@gmail.com>
+
+import pytest
+
+import andaluh
+import andaluh.table
+from andaluh.lib import AndaluhError, set_word_table
+from andaluh.parallel import epa_parallel
+from andaluh.table import (VARIANTS, TranscriptionTable,
+                           compile_transcription_table,
+                           load_transcription_table, read_words)
+
+WORDS = ['hola', 'Vergüenza', 'cardillo', 'feliz', 'xilófono', 'abarloar',
+         'guijarrito', 'haber', 'jamón', 'cigüeña', 'zapato', 'casa']
+
+
+@pytest.fixture(scope='module')
+def table_path(tmp_path_factory):
+    path = tmp_path_factory.mktemp('table') / 'words.table'
+    compile_transcription_table(WORDS + ['no words', ''], str(path),
+                                workers=1)
+    return str(path)
+
+
+@pytest.fixture
+def table(table_path):
+    yield load_transcription_table(table_path)
+    for vaf, vvf in VARIANTS:
+        set_word_table(None, vaf, vvf)
+
+
+def test_transcription_table(table_path):
+    table = TranscriptionTable(table_path)
+    assert len(table) == len(WORDS)
+    assert list(table) == sorted(word.lower() for word in WORDS)
+    assert table.variants == list(VARIANTS)
+
+
+@pytest.mark.parametrize('vaf,vvf', VARIANTS)
+def test_transcription_table_lookups(table_path, vaf, vvf):
+    words = TranscriptionTable(table_path).table(vaf, vvf)
+    for word in WORDS:
+        word = word.lower()
+        assert words[word] == andaluh.epa(word, vaf=vaf, vvf=vvf)
+        for form in (word, word.capitalize(), word.upper()):
+            assert words.replace(form) == andaluh.epa(form, vaf=vaf, vvf=vvf)
+
+    assert words.replace('perro') is None
+    assert words.replace('hOLA') is None
+    with pytest.raises(KeyError):
+        words['perro']
+
+
+def test_transcription_table_case_check(tmp_path, monkeypatch):
+    """Cased forms the rules transcribe otherwise are left to them"""
+
+    def epa_parallel(forms, workers, **kwargs):
+        for form in forms:
+            yield 'Oyá' if form == 'Hola' else andaluh.epa(form, **kwargs)
+
+    monkeypatch.setattr(andaluh.table, 'epa_parallel', epa_parallel)
+    path = str(tmp_path / 'words.table')
+    compile_transcription_table(['hola'], path, variants=[('ç', 'h')])
+    words = TranscriptionTable(path).table('ç', 'h')
+    assert words.replace('hola') == 'ola'
+    assert words.replace('Hola') is None
+    assert words.replace('HOLA') == 'OLA'
+
+
+def test_lexicon_first_table(table):
+    text = 'Hola, la Vergüenza del cardillo FELIZ y el perro'
+    for vaf, vvf in VARIANTS:
+        assert andaluh.epa(text, vaf=vaf, vvf=vvf, lexicon_first=True) == \
+            andaluh.epa(text, vaf=vaf, vvf=vvf)
+
+    info = andaluh.lib.get_transcriber().word_table_info()
+    assert info.size == len(WORDS)
+    assert info.hits == 4
+
+
+def test_epa_parallel_shared_table(table, spawn_pool):
+    """Memory-mapped word tables are shipped to spawned workers"""
+    words = list(epa_parallel(WORDS, workers=2, chunksize=4))
+    assert words == [andaluh.epa(word) for word in WORDS]
+
+
+def test_read_words(tmp_path):
+    path = tmp_path / 'words.txt'
+    path.write_text('Hola hola, VERGÜENZA\ncasa\n', encoding='utf-8')
+    assert read_words(str(path)) == {'hola', 'vergüenza', 'casa'}
+
+    path = tmp_path / 'words.csv'
+    path.write_text('"cas","and"\n"a capela","a capela"\n', encoding='utf-8')
+    assert read_words(str(path), 'cas') == {'a', 'capela'}
+
+
+def test_not_a_transcription_table(tmp_path):
+    path = tmp_path / 'nope.table'
+    path.write_bytes(b'ANDLEX\x00\x01' + b'\0' * 64)
+    with pytest.raises(AndaluhError):
+        TranscriptionTable(str(path))
+
+
+def test_missing_variant(tmp_path):
+    path = str(tmp_path / 'words.table')
+    compile_transcription_table(['hola'], path, variants=[('s', 'j')],
+                                workers=1)
+    table = TranscriptionTable(path)
+    assert table.table('s', 'j')['hola'] == 'ola'
+    with pytest.raises(AndaluhError):
+        table.table('ç', 'h')